@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+
+import time
+
+from lasergen.config import Config
+from lasergen.export import place_2d_objects, export_svg_with_paths
+from lasergen.util import DIR
+from lasergen.units import Rel
+from lasergen.box import ClosedBox
+
+def main(n=20):
+    """
+    Time configuring, rendering and exporting an organizer box with a grid of
+    n x n compartments, the worst case for the number of edges and teeth.
+    """
+
+    c = Config(6., 10., 3., 3., 0.5)
+
+    t = time.perf_counter()
+
+    b = ClosedBox(40*n - 3, 40*n - 3, 50)
+    for column in b.subdivide(DIR.RIGHT, [Rel(1)] * n):
+        column.subdivide(DIR.UP, [Rel(1)] * n)
+    b.configure(c)
+
+    t_configure = time.perf_counter()
+    objects = b.render(c)
+    t_render = time.perf_counter()
+    export_svg_with_paths(place_2d_objects(objects, c), c)
+    t_export = time.perf_counter()
+
+    print('configure {:.2f}s, render {:.2f}s, export {:.2f}s'.format(
+            t_configure - t, t_render - t_configure, t_export - t_render))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,38 @@
-from . import box
-from . import config
-from . import edge
-from . import export
-from . import layer
-from . import planar
-from . import primitive
-from . import units
-from . import util
-from . import wall
+"""
+LaserGen, a library for creating laser cutter designs for boxed cases.
+
+Submodules are imported lazily, on first attribute access, so importing the
+package itself is cheap and does not pull in numpy. See the `Import time`
+section of the user guide.
+"""
+
+import importlib
+
+__all__ = [
+        'box',
+        'clone',
+        'config',
+        'diagnostics',
+        'edge',
+        'export',
+        'layer',
+        'planar',
+        'primitive',
+        'snapshot',
+        'sweep',
+        'units',
+        'util',
+        'wall',
+    ]
+
+def __getattr__(name):
+
+    if name in __all__:
+        module = importlib.import_module('.' + name, __name__)
+        globals()[name] = module
+        return module
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,11 @@
 import numpy as np
 
-from .util import DIR, DIR2
+from . import clone, snapshot
+from .util import DIR, DIR2, gc_paused
 from .units import Rel
-from .edge import CutoutEdge, EDGE_STYLE
-from .wall import Wall, ToplessWall, InvToplessWall, ExtendedWall, SideWall, InvSideWall, SubWall
+from .edge import Edge, CutoutEdge, EdgeReference, EDGE_STYLE, EDGE_ELEMENT_STYLE
+from .planar import RectEdgeCutout
+from .wall import Wall, WallReference, ToplessWall, InvToplessWall, ExtendedWall, SideWall, InvSideWall, SubWall
 
 class Box():
     """
@@ -12,12 +14,17 @@ class Box():
     References its walls and possibly subboxes.
     """
 
+    # axis indices of a grid subdivision, see `subdivide_grid`
+    _grid = None
+
     def __init__(self, width, height, depth, name=None):
         self.size = [width, height, depth]
         self.abs_size = np.array([None, None, None])
 
         self.subboxes = []
         self.position = np.array([0,0,0])
+        self.parent = None
+        self.registry = None
 
         if name is None:
             self.name = type(self).__name__
@@ -71,15 +78,55 @@ class Box():
         else:
             sizes_and_names = (normalize_size_entry(*t) for t in enumerate(sizes))
 
-        if (direction == DIR.RIGHT).all():
+        axis = DIR.dir_to_name(direction)
+
+        if axis == 'RIGHT':
             self.subboxes = [SubBox(size, 'ref', 'ref', name=name) for size, name in sizes_and_names]
-        elif (direction == DIR.UP).all():
+        elif axis == 'UP':
             self.subboxes = [SubBox('ref', size, 'ref', name=name) for size, name in sizes_and_names]
-        elif (direction == DIR.FRONT).all():
+        elif axis == 'FRONT':
             self.subboxes = [SubBox('ref', 'ref', size, name=name) for size, name in sizes_and_names]
 
+        for c in self.subboxes:
+            c.parent = self
+
         return self.subboxes
 
+    def subdivide_grid(self, direction, sizes, other_direction, other_sizes):
+        """
+        Subdivide this box along two axes into a grid of cells, eg. for drawer
+        organizers.
+
+        The box is subdivided into rows along `direction`, each row is
+        subdivided into cells along `other_direction`. Sizes are given like
+        for `subdivide`, `other_sizes` applies to every row.
+
+        Unlike nesting `subdivide` calls, the subwalls between the columns are
+        not split into one short subwall per row. Each of them spans all rows,
+        and the subwalls of both directions are joined by halving joints:
+        slots cut halfway into the subwalls from opposite sides. Thus a grid
+        of N by M cells has N + M - 2 subwalls instead of N * M - 1.
+
+        Grids can't be resized with `set_size`, configure a new box instead.
+
+        Returns a list of rows, each being the list of its cells.
+        """
+
+        ia = DIR.code(direction) // 2
+        ib = DIR.code(other_direction) // 2
+
+        if ia == ib:
+            raise ValueError('Grid directions must lie on different axes.')
+
+        rows = self.subdivide(direction, sizes)
+
+        for row in rows:
+            row.subdivide(other_direction, other_sizes)
+
+        self._grid = (ia, ib)
+
+        return [row.subboxes for row in rows]
+
 
     def get_wall_by_direction(self, v):
         """
@@ -91,30 +138,70 @@ class Box():
 
         return self.walls[self._get_wall_index_by_direction(v)]
 
+    # wall indices UP, DOWN, LEFT, RIGHT, FRONT, BACK by direction code
+    _WALL_INDICES = [3, 2, 0, 1, 4, 5]
+
     @staticmethod
     def _get_wall_index_by_direction(v):
-        if (v == DIR.UP).all():    return 0
-        if (v == DIR.DOWN).all():  return 1
-        if (v == DIR.LEFT).all():  return 2
-        if (v == DIR.RIGHT).all(): return 3
-        if (v == DIR.FRONT).all(): return 4
-        if (v == DIR.BACK).all():  return 5
+        c = DIR.code(v)
+        if c is not None:
+            return Box._WALL_INDICES[c]
 
 
-    def render(self, config):
+    def render(self, config, workers=None):
         """
         Render this box's and all its subboxes' walls into a list of `Object2D`s.
+
+        If `workers` is given, walls are rendered in a pool of that many forked
+        processes. The result is the same as rendering serially.
         """
 
-        # uniquify wall references, keep order for deterministic output
-        seen = set()
-        walls = [x for x,_,_ in self._gather_walls(config) if not (x in seen or seen.add(x))]
-        return [w.render(config) for w in walls]
+        walls = [w for w,_,_ in self._get_registry(config).get_placements(self)]
+
+        # tooth layouts are calculated before forking, so the workers share them
+        self._prepare_edges(walls, config)
+
+        return Wall._render_walls(walls, config, workers)
 
-    def _gather_walls(self, config):
+    @staticmethod
+    def _prepare_edges(walls, config):
+        """
+        Calculate the tooth layout of all edges of the given walls in one
+        batch, before rendering the walls.
+
+        Edges are processed in the order rendering would process them, so
+        warnings are printed in the same order.
+        """
+
+        edges = []
+
+        for w in walls:
+            for i in [0, 3, 1, 2]:
+                e = w.edges[i].dereference()
+                edges.append(e)
+                if e.counterpart is not None:
+                    edges.append(e.counterpart.dereference())
+
+        Edge._prepare_element_lists(edges, config)
+
+    def _get_registry(self, config):
         """
-        Get a list of this box and its subboxes' walls, their positions and
-        directions.
+        Return the registry of the configured box tree this box belongs to.
+
+        The registry is built by `configure` and rebuilt if the config changed
+        since.
+        """
+
+        root = self._get_root()
+
+        if root.registry is None or root.registry.fingerprint != config.fingerprint():
+            root.registry = BoxRegistry(root, config)
+
+        return root.registry
+
+    def _gather_own_walls(self, config):
+        """
+        Get a list of this box's walls, their positions and directions.
         """
 
         s = []
@@ -138,10 +225,6 @@ class Box():
 
             s.append((wall.dereference(), position, d))
 
-
-        for c in self.subboxes:
-            s.extend(c._gather_walls(config))
-
         return s
 
 
@@ -153,169 +236,363 @@ class Box():
         any walls.
         """
 
-        self._configure_rec(config)
-        self._construct_rec(config)
+        with gc_paused():
+
+            self._reset_absolute_sizes()
+
+            # the axes are independent of each other, solve them one by one
+            for i in range(3):
+                self._solve_size_up(i, config)
+
+            self._construct_tree(config)
+
+            self.registry = BoxRegistry(self, config)
 
-    def _configure_rec(self, config):
+    def set_size(self, axis, value, config):
         """
-        Recursive implementation of configure.
+        Change this box's configured size along the given axis and update an
+        already configured box tree in place.
+
+        `value` may be anything `subdivide` accepts as size, except `'ref'`.
+        Sizes bound to the parent box (`'ref'`) can't be changed.
+
+        Absolute sizes are solved again along the changed axis. Afterwards
+        only the branch containing changed boxes is constructed again, and the
+        resulting sizes and positions are copied into the existing walls,
+        edges and references. Thus references held by the user stay valid and
+        children and edge elements added to the walls stay attached.
+
+        Children added through a wall reference keep their position relative
+        to that reference. Coordinates given as `Frac` values are not
+        recalculated. Edge elements keep their position on the edge. If an
+        edge element doesn't fit into its shrunk edge, the old sizes are
+        restored and a ValueError is raised.
+        """
+
+        c = DIR.code(axis)
+        if c is None:
+            raise ValueError('Invalid axis given.')
+
+        Box._set_sizes([(self, c // 2, value)], config)
 
-        Follows a bottom-up approach.
+    @staticmethod
+    def _set_sizes(changes, config):
         """
+        Internal, implementation of `set_size`.
 
-        self.abs_size = np.array([None, None, None])
+        Apply several size changes, given as `(box, axis_index, value)`
+        tuples, to boxes of the same tree at once, so intermediate states
+        don't need to be consistent.
+        """
 
-        for c in self.subboxes:
-            c._configure_rec(config)
+        for b, i, value in changes:
+            if value == 'ref' or b.size[i] == 'ref':
+                raise ValueError('Sizes bound to the parent box can\'t be changed.')
 
+        root = changes[0][0]._get_root()
+        assert all(b._get_root() is root for b, _, _ in changes)
 
-        # dimensions
-        for i in range(3):
+        old_values = [b.size[i] for b, i, _ in changes]
 
-            sum_abs_size, sum_rel_size, unit_length, ref_size = self._get_sum(config)
+        for b, i, value in changes:
+            b.size[i] = value
 
-            # fixed absolute size configured?
-            if self._has_absolute_width_configured(i):
-                self.abs_size[i] = self.size[i]
+        if not hasattr(root, 'walls'):
+            # not configured yet
+            return
 
-            # take absolute size from bound children
-            if ref_size[i] is not None:
-                assert self.abs_size[i] is None or ref_size[i] == self.abs_size[i]
-                self.abs_size[i] = ref_size[i]
+        axes = sorted(set(i for _, i, _ in changes))
 
-            # calculate unit_length from own size
-            if self.abs_size[i] is not None and sum_rel_size[i] != Rel(0):
-                assert self.abs_size[i] >= sum_abs_size[i]
-                new_ul = sum_rel_size[i].unit_length_from_total(self.size[i] - sum_abs_size[i])
+        boxes = root._get_boxes()
+        old_sizes = [b.abs_size.copy() for b in boxes]
 
-                if unit_length[i] is not None:
-                    assert new_ul == unit_length[i]
+        def restore():
+            for (b, i, _), old_value in zip(changes, old_values):
+                b.size[i] = old_value
+            for b, abs_size in zip(boxes, old_sizes):
+                b.abs_size = abs_size
 
-                unit_length[i] = new_ul
+        try:
+            for i in axes:
+                root._reset_absolute_sizes(i)
+                root._solve_size_up(i, config)
 
+            changed = [b for b, abs_size in zip(boxes, old_sizes) if any(b.abs_size[i] != abs_size[i] for i in axes)]
 
-            # if unit_length is available update unknown subbox sizes
-            if unit_length[i] is not None:
+            if not changed:
+                return
 
-                for c in self.subboxes:
-                    if isinstance(c.size[i], Rel) and c.abs_size[i] is None:
-                        c._set_absolute_size(c.size[i].total_length_from_unit(unit_length[i]), i, config)
-                        #sum_size[i] += t
+            # the parents of the changed boxes need to update their subwalls
+            branch = Box._get_common_ancestor([b.parent if b.parent is not None else b for b in changed])
 
+            # grid subwalls span several subboxes, see `subdivide_grid`
+            if any(b._grid is not None for b in [branch.parent] + branch._get_boxes() if b is not None):
+                raise ValueError('Grid subdivisions can\'t be resized, configure a new box instead.')
 
-            sum_size, unknown_children_count = self._get_final_sum(config)
+        except:
+            restore()
+            raise
 
+        branch._reconstruct(config)
 
-            if self.size[i] is None:
-                # all children's sizes must be known
-                assert unknown_children_count[i] == 0
+        # wall positions have changed
+        root.registry = BoxRegistry(root, config)
 
-                # own size must be known somehow
-                assert sum_size[i] is not None or ref_size[i] is not None
+        # edge elements added by the user may not fit into shrunk edges, in
+        # this case construct the branch with the old sizes again
+        try:
+            for e in root.registry.edges:
+                e._check_sub_element_list_bounds(e.sub_elements)
 
-                if sum_size[i] is None:
-                    self.abs_size[i] = ref_size[i] # should be a NOP
-                elif ref_size[i] is None:
-                    self.abs_size[i] = sum_size[i]
-                else:
-                    assert ref_size[i] == sum_size[i]
-                    self.abs_size[i] = sum_size[i]
+        except ValueError:
+            restore()
+            branch._reconstruct(config)
+            root.registry = BoxRegistry(root, config)
+            raise
 
-            elif self.size[i] == 'ref':
-                if unknown_children_count[i] == 0 and sum_size[i] is not None:
-                    self.abs_size[i] = sum_size[i]
-                else:
-                    # there are relative sized subboxes, but the unit length is unknown
-                    # or there aren't any children
-                    pass
+    def _get_root(self):
 
-            elif isinstance(self.size[i], Rel):
-                if unknown_children_count[i] == 0 and sum_size[i] is not None:
-                    self.abs_size[i] = sum_size[i]
-                else:
-                    # there are relative sized subboxes, but the unit length is unknown
-                    # or there aren't any children
-                    pass
+        root = self
+        while root.parent is not None:
+            root = root.parent
 
-            elif self._has_absolute_width_configured(i):
-                # all children's sizes must be known, this is known implicitly
-                assert unknown_children_count[i] == 0
+        return root
 
-                if self.abs_size[i] is not None:
-                    assert self.abs_size[i] == self.size[i]
-                if sum_size[i] is not None:
-                    assert sum_size[i] == self.size[i]
-                self.abs_size[i] = self.size[i]
+    def _get_boxes(self):
+        """
+        Return a list of this box and all its subboxes, recursively, in depth
+        first order, parents before their subboxes.
+        """
 
+        l = []
+        stack = [self]
 
-            # update bound subbox sizes
-            if self.abs_size[i] is not None:
+        while stack:
+            box = stack.pop()
+            l.append(box)
+            stack.extend(reversed(box.subboxes))
 
-                for c in self.subboxes:
-                    if c.size[i] == 'ref' and c.abs_size[i] is None:
-                        c._set_absolute_size(self.abs_size[i], i, config)
+        return l
 
-    def _get_sum(self, config):
+    @staticmethod
+    def _get_common_ancestor(boxes):
+        """
+        Return the lowest box being an ancestor (or the box itself) of all
+        given boxes.
+        """
+
+        def path(b):
+            p = []
+            while b is not None:
+                p.append(b)
+                b = b.parent
+            return p[::-1]
+
+        paths = [path(b) for b in boxes]
+        common = paths[0][0]
+
+        for boxes_at_depth in zip(*paths):
+            if any(b is not boxes_at_depth[0] for b in boxes_at_depth):
+                break
+            common = boxes_at_depth[0]
+
+        return common
+
+    def _reconstruct(self, config):
+        """
+        Internal, for `set_size`.
+
+        Construct walls and references of this box's branch again, with the
+        already solved sizes, and copy the new geometry into the existing
+        objects.
+
+        The root box constructs all walls again. Other boxes keep their own
+        walls and only construct their subboxes' references and subwalls. In
+        this case the new cutout edges are added to the existing walls, they
+        are removed again after copying their geometry.
+        """
+
+        boxes = self._get_boxes()
+
+        if self.parent is not None:
+            boxes = boxes[1:]
+
+        old_walls = [b.walls for b in boxes]
+        old_cutout_edges = [getattr(b, '_cutout_edges', []) for b in self._get_boxes()]
+
+        # children added to own walls while constructing
+        own_walls = [w.dereference() for w in self.walls if w is not None]
+        children_counts = [len(w.children) for w in own_walls]
+
+        if self.parent is None:
+            self._construct_tree(config)
+        else:
+            self._set_subbox_positions(config)
+            self._construct_subwalls(config)
+
+            for c in self.subboxes:
+                c._construct_tree(config)
+
+        new_walls = [b.walls for b in boxes]
+        new_cutout_edges = [b._cutout_edges for b in self._get_boxes()]
+
+        if self.parent is not None:
+            for w, count in zip(own_walls, children_counts):
+                del w.children[count:]
+
+        # copy geometry, restore old objects
+        seen = set()
+        walls = set(own_walls) if self.parent is not None else set()
+
+        for b, old, new in zip(boxes, old_walls, new_walls):
+            for old_ref, new_ref in zip(old, new):
+                _copy_geometry(old_ref, new_ref, seen, walls)
+            b.walls = old
+
+        for b, old, new in zip(self._get_boxes(), old_cutout_edges, new_cutout_edges):
+            assert len(old) == len(new)
+            for old_edge, new_edge in zip(old, new):
+                _copy_geometry(old_edge, new_edge, seen, walls)
+            b._cutout_edges = old
+
+        # move children added through (now possibly moved) references
+        for w in walls:
+            w._update_children_positions()
+
+    def _reset_absolute_sizes(self, i=None):
         """
         Internal, for configure step.
 
-        Sum up the children's configured and already calculated sizes and
-        assert some restrictions.
+        Forget all calculated sizes of this box and its subboxes, only along
+        axis `i` if given.
         """
 
-        # sum of all absolute configured children (size is int, float or None) plus subwalls
-        sum_abs_size = [0, 0, 0]
-        # (relative) sum of all relative configured children
-        sum_rel_size = [Rel(0), Rel(0), Rel(0)]
-        # unit length taken from relative configured children, all must match, None if unknown
-        unit_length = [None, None, None]
-        # absolute size taken from reference configured children, all must match, None if unknown
-        ref_size = [None, None, None]
+        for box in self._get_boxes():
+            if i is None:
+                box.abs_size = np.array([None, None, None])
+            else:
+                box.abs_size[i] = None
 
-        for i in range(3):
-            non_ref_children_count = sum(1 for c in self.subboxes if c.size[i] != 'ref')
-            if non_ref_children_count > 1:
-                sum_abs_size[i] += (non_ref_children_count - 1) * config.subwall_thickness
+    def _solve_size_up(self, i, config):
+        """
+        Internal, for configure step.
 
-        for c in self.subboxes:
+        Bottom-up pass calculating the absolute size along axis `i` of this box
+        and its subboxes, as far as they are known from the subboxes. Sizes
+        which are only known from above are passed down by
+        `_solve_size_down`.
 
-            for i in range(3):
+        Every box is visited once by each pass, and each visit only looks at
+        the box's direct children a constant number of times, so the total
+        cost is linear in the number of boxes.
+        """
 
-                assert not (c.size[i] is None and c.abs_size[i] is None)
+        # subboxes before their parents, sibling branches are independent
+        for box in reversed(self._get_boxes()):
+            box._solve_own_size_up(i, config)
 
-                if c.size[i] is None:
-                    assert c.abs_size[i] is not None
-                    #sum_size[i] += c.abs_size[i]
-                    sum_abs_size[i] += c.abs_size[i]
+    def _solve_own_size_up(self, i, config):
+        """
+        Internal, for configure step.
 
-                elif c.size[i] == 'ref':
-                    if c.abs_size[i] is not None:
-                        assert ref_size[i] is None or ref_size[i] == c.abs_size[i]
-                        ref_size[i] = c.abs_size[i]
+        Visit of a single box in `_solve_size_up`, all its subboxes have
+        already been visited.
+        """
 
-                elif isinstance(c.size[i], Rel):
-                    if c.abs_size[i] is None:
-                        sum_rel_size[i] += c.size[i]
-                    else:
-                        #sum_size[i] += c.abs_size[i]
+        sum_abs_size, sum_rel_size, unit_length, ref_size = self._get_sum(i, config)
 
-                        sum_rel_size[i] += c.size[i]
-                        new_ul = c.size[i].unit_length_from_total(c.abs_size[i])
-                        assert unit_length[i] is None or new_ul == unit_length[i]
-                        unit_length[i] = new_ul
+        # fixed absolute size configured?
+        if self._has_absolute_width_configured(i):
+            self.abs_size[i] = self.size[i]
 
-                elif c._has_absolute_width_configured(i):
-                    assert c.abs_size[i] is not None
-                    #sum_size[i] += c.abs_size[i]
-                    sum_abs_size[i] += c.abs_size[i]
+        # take absolute size from bound children
+        if ref_size is not None:
+            assert self.abs_size[i] is None or ref_size == self.abs_size[i]
+            self.abs_size[i] = ref_size
 
-        return sum_abs_size, sum_rel_size, unit_length, ref_size
+        # calculate unit_length from own size
+        if self.abs_size[i] is not None and sum_rel_size != Rel(0):
+            assert self.abs_size[i] >= sum_abs_size
+            new_ul = sum_rel_size.unit_length_from_total(self.size[i] - sum_abs_size)
 
-    def _set_absolute_size(self, value, i, config):
+            if unit_length is not None:
+                assert new_ul == unit_length
+
+            unit_length = new_ul
+
+
+        # if unit_length is available update unknown subbox sizes
+        if unit_length is not None:
+
+            for c in self.subboxes:
+                if isinstance(c.size[i], Rel) and c.abs_size[i] is None:
+                    c._solve_size_down(c.size[i].total_length_from_unit(unit_length), i, config)
+
+
+        sum_size, unknown_children_count = self._get_final_sum(i, config)
+
+
+        if self.size[i] is None:
+            # all children's sizes must be known
+            assert unknown_children_count == 0
+
+            # own size must be known somehow
+            assert sum_size is not None or ref_size is not None
+
+            if sum_size is None:
+                self.abs_size[i] = ref_size # should be a NOP
+            elif ref_size is None:
+                self.abs_size[i] = sum_size
+            else:
+                assert ref_size == sum_size
+                self.abs_size[i] = sum_size
+
+        elif self.size[i] == 'ref' or isinstance(self.size[i], Rel):
+            if unknown_children_count == 0 and sum_size is not None:
+                self.abs_size[i] = sum_size
+            else:
+                # there are relative sized subboxes, but the unit length is unknown
+                # or there aren't any children
+                pass
+
+        elif self._has_absolute_width_configured(i):
+            # all children's sizes must be known, this is known implicitly
+            assert unknown_children_count == 0
+
+            if self.abs_size[i] is not None:
+                assert self.abs_size[i] == self.size[i]
+            if sum_size is not None:
+                assert sum_size == self.size[i]
+            self.abs_size[i] = self.size[i]
+
+
+        # update bound subbox sizes
+        if self.abs_size[i] is not None:
+
+            for c in self.subboxes:
+                if c.size[i] == 'ref' and c.abs_size[i] is None:
+                    c._solve_size_down(self.abs_size[i], i, config)
+
+    def _solve_size_down(self, value, i, config):
+        """
+        Internal, for configure step.
+
+        Top-down pass setting the now known size along axis `i` of a subbox
+        and the sizes of its subboxes depending on it.
+        """
+
+        stack = [(self, value)]
+
+        while stack:
+            box, value = stack.pop()
+            stack.extend(reversed(box._solve_own_size_down(value, i, config)))
+
+    def _solve_own_size_down(self, value, i, config):
         """
         Internal, for configure step.
 
-        Top-down approach for setting now known sizes for subboxes.
+        Visit of a single box in `_solve_size_down`. Returns a list of
+        `(subbox, value)` tuples to visit next.
         """
 
         assert isinstance(self.size[i], Rel) or self.size[i] == 'ref'
@@ -327,26 +604,82 @@ class Box():
         # update subboxes
 
         if not self.subboxes:
-            return
+            return []
 
-        sum_abs_size, sum_rel_size, unit_length, ref_size = self._get_sum(config)
+        sum_abs_size, sum_rel_size, unit_length, ref_size = self._get_sum(i, config)
 
-        assert unit_length[i] is None
-        assert ref_size[i] is None
+        assert unit_length is None
+        assert ref_size is None
 
-        if sum_rel_size[i] != Rel(0):
-            assert self.abs_size[i] >= sum_abs_size[i]
-            unit_length[i] = sum_rel_size[i].unit_length_from_total(self.abs_size[i] - sum_abs_size[i])
+        if sum_rel_size != Rel(0):
+            assert self.abs_size[i] >= sum_abs_size
+            unit_length = sum_rel_size.unit_length_from_total(self.abs_size[i] - sum_abs_size)
+
+        l = []
 
         for c in self.subboxes:
             if c.abs_size[i] is None:
                 if isinstance(c.size[i], Rel):
-                    c._set_absolute_size(c.size[i].total_length_from_unit(unit_length[i]), i, config)
+                    l.append((c, c.size[i].total_length_from_unit(unit_length)))
                 elif c.size[i] == 'ref':
-                    c._set_absolute_size(value, i, config)
+                    l.append((c, value))
                 else:
                     assert False
 
+        return l
+
+    def _get_sum(self, i, config):
+        """
+        Internal, for configure step.
+
+        Sum up the children's configured and already calculated sizes along
+        axis `i` and assert some restrictions.
+        """
+
+        non_ref_children_count = sum(1 for c in self.subboxes if c.size[i] != 'ref')
+
+        # sum of all absolute configured children (size is int, float or None) plus subwalls
+        sum_abs_size = 0
+
+        if non_ref_children_count > 1:
+            sum_abs_size += (non_ref_children_count - 1) * config.subwall_thickness
+
+        # (relative) sum of all relative configured children
+        sum_rel_size = Rel(0)
+        # unit length taken from relative configured children, all must match, None if unknown
+        unit_length = None
+        # absolute size taken from reference configured children, all must match, None if unknown
+        ref_size = None
+
+        for c in self.subboxes:
+
+            size = c.size[i]
+            abs_size = c.abs_size[i]
+
+            assert not (size is None and abs_size is None)
+
+            if size is None:
+                sum_abs_size += abs_size
+
+            elif size == 'ref':
+                if abs_size is not None:
+                    assert ref_size is None or ref_size == abs_size
+                    ref_size = abs_size
+
+            elif isinstance(size, Rel):
+                sum_rel_size += size
+
+                if abs_size is not None:
+                    new_ul = size.unit_length_from_total(abs_size)
+                    assert unit_length is None or new_ul == unit_length
+                    unit_length = new_ul
+
+            elif c._has_absolute_width_configured(i):
+                assert abs_size is not None
+                sum_abs_size += abs_size
+
+        return sum_abs_size, sum_rel_size, unit_length, ref_size
+
     def _has_absolute_width_configured(self, i):
         """
         Internal, for configure step.
@@ -354,56 +687,62 @@ class Box():
 
         return isinstance(self.size[i], int) or isinstance(self.size[i], float)
 
-    def _get_final_sum(self, config):
+    def _get_final_sum(self, i, config):
         """
         Internal, for configure step.
 
-        Sum up the total sum all children, also considering subwall thicknesses.
+        Sum up the total size of all children along axis `i`, also
+        considering subwall thicknesses.
+
+        Returns the sum of the final sizes of all non-ref children plus
+        subwalls, None if there are none with known size, and the number of
+        still unknown non-ref children.
         """
 
-        # sum of final size of all non-ref children plus subwalls, None if there are none (with known size)
-        sum_size = [None, None, None]
-        # number of still unknown children
-        unknown_children_count = [0, 0, 0]
+        sum_size = None
+        unknown_children_count = 0
+        non_ref_children_count = 0
 
-        for i in range(3):
+        for c in self.subboxes:
 
-            unknown_children_count[i] = sum(1 for c in self.subboxes
-                    if c.abs_size[i] is None
-                    and c.size[i] != 'ref'
-                )
+            if c.size[i] == 'ref':
+                continue
 
-            non_ref_children_count = sum(1 for c in self.subboxes if c.size[i] != 'ref')
-            if non_ref_children_count > 1:
-                subwall_sum = (non_ref_children_count - 1) * config.subwall_thickness
-            else:
-                subwall_sum = 0
+            non_ref_children_count += 1
 
-            l = [c.abs_size[i] for c in self.subboxes
-                    if c.abs_size[i] is not None
-                    and c.size[i] != 'ref'
-                ]
+            if c.abs_size[i] is None:
+                unknown_children_count += 1
+            elif sum_size is None:
+                sum_size = c.abs_size[i]
+            else:
+                sum_size += c.abs_size[i]
 
-            if l:
-                sum_size[i] = sum(l) + subwall_sum
+        if sum_size is not None and non_ref_children_count > 1:
+            sum_size += (non_ref_children_count - 1) * config.subwall_thickness
 
         return sum_size, unknown_children_count
 
 
-    def _construct_rec(self, config):
+    def _construct_tree(self, config):
         """
-        Recursive implementation of construct.
+        Implementation of construct.
 
-        Construct the boxes' walls and subwalls.
+        Construct the walls and subwalls of this box and its subboxes, parents
+        before their subboxes.
+        """
+
+        for box in self._get_boxes():
+            box._construct(config)
+
+    def _construct(self, config):
+        """
+        Construct this box's walls and its subboxes' subwalls.
         """
 
         self._construct_walls()
         self._set_subbox_positions(config)
         self._construct_subwalls(config)
 
-        for c in self.subboxes:
-            c._construct_rec(config)
-
     def _construct_walls(self):
         """
         Defined for box templates. Use to automatically construct walls for
@@ -437,11 +776,18 @@ class Box():
 
         # TODO use subbox positions to simplify this code
 
+        # constructed cutout edges, in order, see `set_size`
+        self._cutout_edges = []
+
         if not self.subboxes:
             return
 
+        # the cells of grid rows are set up by the grid box
+        if self.parent is not None and self.parent._grid is not None:
+            return
+
         cur_pos = np.array([0.,0.,0.])
-        cur_wall_refs = [self.get_wall_by_direction(-d) for d in DIR.AXES]
+        cur_wall_refs = [self.get_wall_by_direction(DIR.DIRS[2*i+1]) for i in range(3)]
 
         # assert subdivision only along one axis
         non_ref_indices = [i for i,s in enumerate(self.subboxes[0].size) if s != 'ref']
@@ -467,8 +813,12 @@ class Box():
                 else:
                     assert c.size[i] == 'ref'
 
+                # the negative direction constant, arrays computed by `-d`
+                # miss the fast direction code lookup
+                neg_d = DIR.DIRS[2*i+1]
+
                 pos_index = self._get_wall_index_by_direction(d)
-                neg_index = self._get_wall_index_by_direction(-d)
+                neg_index = self._get_wall_index_by_direction(neg_d)
 
                 # needed because some of the surrounding walls may not be references / have projection_dirs
                 to_local_coords = lambda v: DIR.project_along_axis(v, d)
@@ -476,7 +826,7 @@ class Box():
                 # set negative wall
                 r = cur_wall_refs[i]
                 if r is not None:
-                    c.walls[neg_index] = r.get_reference(to_local_coords(cur_pos), to_local_coords(c.abs_size), projection_dir=-d)
+                    c.walls[neg_index] = r.get_reference(to_local_coords(cur_pos), to_local_coords(c.abs_size), projection_dir=neg_d)
                 else:
                     c.walls[neg_index] = None
 
@@ -493,29 +843,15 @@ class Box():
 
                     # need to create a new subwall
 
-                    ref_wall = self.get_wall_by_direction(-d)
+                    ref_wall = self.get_wall_by_direction(neg_d)
                     name = '{}.SUB{}{}'.format(self.name, DIR.dir_to_axis_name(d), box_index)
                     r = SubWall(ref_wall.size, name=name)
 
-                    # add cutout edges
-                    j, k = [DIR.AXES[a] for a in range(3) if a != i]
-
-                    for target_dir, other_dir in [(j,k), (-j,k), (k,j), (-k,j)]:
-
-                        target_wall = self.get_wall_by_direction(target_dir)
-                        if target_wall is not None:
+                    for target_dir, e in self._add_cutout_edges(r, d, cur_pos + c.abs_size[i] * d):
 
-                            # create CutoutEdge object
-                            l = ref_wall.to_local_coords(other_dir).dot(ref_wall.size) # size of reference wall in direction other_dir
-                            e = CutoutEdge(l, target_wall.to_local_coords(d), EDGE_STYLE.TOOTHED, EDGE_STYLE.TOOTHED)
-                            target_wall.add_child(e, cur_pos + c.abs_size[i] * d)
-
-                            # set counterpart between new CutoutEdge and corresponding edge of new SubWall
-                            e.set_counterpart(r.get_edge_by_direction(to_local_coords(target_dir)).dereference())
-
-                            # add edge reference in working direction to the wall reference perpendicular to working direction
-                            child_target_wall_ref = c.get_wall_by_direction(target_dir)
-                            child_target_wall_ref.edges[Wall._get_edge_index_by_direction(child_target_wall_ref.to_local_coords(d))] = e.get_reference()
+                        # add edge reference in working direction to the wall reference perpendicular to working direction
+                        child_target_wall_ref = c.get_wall_by_direction(target_dir)
+                        child_target_wall_ref.edges[Wall._get_edge_index_by_direction(child_target_wall_ref.to_local_coords(d))] = e.get_reference()
 
                     # add wall reference in working direction to current sobbox
                     c.walls[pos_index] = r.get_reference(to_local_coords(cur_pos), to_local_coords(c.abs_size), projection_dir=d)
@@ -532,11 +868,205 @@ class Box():
                     cutout_edge = cur_wall_refs[working_axis_index].get_edge_by_direction(local_target_dir).dereference()
 
                     child_target_wall_ref = c.get_wall_by_direction(target_dir)
+
+                    # eg. the open side of a topless box
+                    if child_target_wall_ref is None:
+                        continue
+
                     edge_index = Wall._get_edge_index_by_direction(child_target_wall_ref.to_local_coords(-working_axis))
                     child_target_wall_ref.edges[edge_index] = cutout_edge.get_reference()
 
             c._set_wallref_names()
 
+        if self._grid is not None:
+            self._construct_grid_subwalls(config)
+
+    def _add_cutout_edges(self, subwall, d, pos):
+        """
+        Add cutout edges for a new subwall perpendicular to direction `d` at
+        the given position to this box's walls, and set the subwall's edges
+        as their counterparts.
+
+        Returns a list of `(direction, cutout_edge)` tuples.
+        """
+
+        ref_wall = self.get_wall_by_direction(-d)
+        i = DIR.code(d) // 2
+        j, k = [DIR.AXES[a] for a in range(3) if a != i]
+
+        edges = []
+
+        for target_dir, other_dir in [(j,k), (-j,k), (k,j), (-k,j)]:
+
+            target_wall = self.get_wall_by_direction(target_dir)
+            if target_wall is not None:
+
+                # create CutoutEdge object
+                l = ref_wall.to_local_coords(other_dir).dot(ref_wall.size) # size of reference wall in direction other_dir
+                e = CutoutEdge(l, target_wall.to_local_coords(d), EDGE_STYLE.TOOTHED, EDGE_STYLE.TOOTHED)
+                target_wall.add_child(e, pos)
+                self._cutout_edges.append(e)
+
+                # set counterpart between new CutoutEdge and corresponding edge of new SubWall
+                e.set_counterpart(subwall.get_edge_by_direction(DIR.project_along_axis(target_dir, d)).dereference())
+
+                edges.append((target_dir, e))
+
+        return edges
+
+    def _construct_grid_subwalls(self, config):
+        """
+        Construct the continuous subwalls of a grid, see `subdivide_grid`.
+
+        The subwalls between the rows have already been constructed like for
+        any subdivision. Construct the subwalls between the columns spanning
+        all rows, cut halving joint slots into both, and set up the cells'
+        wall references.
+        """
+
+        ia, ib = self._grid
+        a, b = DIR.AXES[ia], DIR.AXES[ib]
+        c = DIR.AXES[3 - ia - ib]
+
+        rows = self.subboxes
+        column_sizes = [cell.abs_size[ib] for cell in rows[0].subboxes]
+
+        for row in rows:
+            if [cell.abs_size[ib] for cell in row.subboxes] != column_sizes:
+                raise ValueError('Grid columns of {} don\'t line up.'.format(self.name))
+
+        t = config.subwall_thickness
+        height = self.abs_size[3 - ia - ib]
+
+        # offsets of rows and columns inside this box
+        row_offsets = np.cumsum([0] + [row.abs_size[ia] + t for row in rows[:-1]])
+        column_offsets = np.cumsum([0] + [size + t for size in column_sizes[:-1]])
+
+        row_walls = [rows[n].get_wall_by_direction(a).dereference() for n in range(len(rows) - 1)]
+        column_walls = []
+        column_cutout_edges = []
+
+        ref_wall = self.get_wall_by_direction(-b)
+
+        for m, size in enumerate(column_sizes[:-1]):
+
+            name = '{}.SUB{}{}'.format(self.name, DIR.dir_to_axis_name(b), m)
+            w = SubWall(ref_wall.size, name=name)
+
+            column_walls.append(w)
+            column_cutout_edges.append({DIR.code(d): e for d, e in self._add_cutout_edges(w, b, (column_offsets[m] + size) * b)})
+
+        # halving joints, row subwalls are slotted from the positive, column
+        # subwalls from the negative side. The slotted edges are flat, slots
+        # would split their teeth into segments too short for the tooth
+        # length restrictions. The subwalls are held by the teeth of their
+        # other edges.
+        for w, projection_dir, edge_dir in [(w, a, c) for w in row_walls] + [(w, b, -c) for w in column_walls]:
+            self._flatten_grid_edge(w, projection_dir, edge_dir)
+
+        for n, row_wall in enumerate(row_walls):
+            for m, column_wall in enumerate(column_walls):
+                self._add_grid_slot(row_wall, a, c, (column_offsets[m] + column_sizes[m]) * b + height * c, t * b + height / 2 * c)
+                self._add_grid_slot(column_wall, b, -c, (row_offsets[n] + rows[n].abs_size[ia]) * a, t * a + height / 2 * c)
+
+        # the subwalls cross where they meet, nothing is rendered there, but
+        # the cells' wall references need edges
+        row_joints = [[Edge(height, DIR.project_along_axis(b, a), style=EDGE_ELEMENT_STYLE.REMOVE) for _ in column_walls] for _ in row_walls]
+        column_joints = [[Edge(height, DIR.project_along_axis(a, b), style=EDGE_ELEMENT_STYLE.REMOVE) for _ in row_walls] for _ in column_walls]
+
+        def get_edge(d, n, m):
+            """
+            Return the edge the cells in row `n` and direction `d` share with
+            column subwall `m`.
+            """
+
+            if DIR.code(d) // 2 != ia:
+                return column_cutout_edges[m][DIR.code(d)].get_reference(row_offsets[n], rows[n].abs_size[ia])
+
+            n = n if DIR.code(d) == DIR.code(a) else n - 1
+
+            if 0 <= n < len(row_walls):
+                return row_joints[n][m].get_reference()
+
+            return column_cutout_edges[m][DIR.code(d)].get_reference()
+
+        for n, row in enumerate(rows):
+
+            # the row's part of the column subwalls
+            column_refs = []
+
+            for m, w in enumerate(column_walls):
+
+                r = w.get_reference(DIR.project_along_axis(row_offsets[n] * a, b), DIR.project_along_axis(row.abs_size, b), projection_dir=b)
+
+                for d, joint in [(-a, n - 1), (a, n)]:
+                    if 0 <= joint < len(row_walls):
+                        r.edges[Wall._get_edge_index_by_direction(r.to_local_coords(d))] = column_joints[m][joint].get_reference()
+
+                column_refs.append(r)
+
+            for m, cell in enumerate(row.subboxes):
+
+                cell.walls = [None] * 6
+                pos = column_offsets[m] * b
+
+                for d in DIR.DIRS:
+
+                    r = row.get_wall_by_direction(d)
+                    p = pos
+
+                    if DIR.code(d) == DIR.code(-b) and m > 0:
+                        r, p = column_refs[m - 1], np.array([0, 0, 0])
+                    elif DIR.code(d) == DIR.code(b) and m < len(column_walls):
+                        r, p = column_refs[m], np.array([0, 0, 0])
+
+                    if r is not None:
+                        cell.walls[self._get_wall_index_by_direction(d)] = r.get_reference(DIR.project_along_axis(p, d), DIR.project_along_axis(cell.abs_size, d), projection_dir=d)
+
+                # add edge references to the column subwalls to the wall
+                # references perpendicular to them
+                for side, joint in [(-b, m - 1), (b, m)]:
+
+                    if not 0 <= joint < len(column_walls):
+                        continue
+
+                    for d in DIR.perpendicular_dirs(b):
+
+                        r = cell.get_wall_by_direction(d)
+                        if r is not None:
+                            r.edges[Wall._get_edge_index_by_direction(r.to_local_coords(side))] = get_edge(d, n, joint)
+
+                cell._set_wallref_names()
+
+    @staticmethod
+    def _flatten_grid_edge(wall, projection_dir, edge_dir):
+        """
+        Set the edge of a grid subwall receiving the halving joint slots to
+        flat, see `_construct_grid_subwalls`.
+        """
+
+        e = wall.get_reference(projection_dir=projection_dir).get_edge_by_direction(edge_dir)
+
+        # the open side of a topless box has no counterpart
+        e.set_style(EDGE_ELEMENT_STYLE.FLAT, set_counterpart=e.dereference().counterpart is not None)
+
+    @staticmethod
+    def _add_grid_slot(wall, projection_dir, edge_dir, pos, size):
+        """
+        Cut a halving joint slot into a grid subwall, see
+        `_construct_grid_subwalls`.
+        """
+
+        r = wall.get_reference(projection_dir=projection_dir)
+
+        slot = RectEdgeCutout(size, edge_dir, add_edge_elements=False)
+        r.add_child(slot, pos)
+
+        # the open side of a topless box has no counterpart
+        e = r.get_edge_by_direction(edge_dir)
+        e.add_element(slot.position, slot.size, EDGE_ELEMENT_STYLE.REMOVE, EDGE_STYLE.INTERNAL_FLAT, EDGE_STYLE.INTERNAL_FLAT,
+                auto_add_counterpart=e.dereference().counterpart is not None)
+
 
     def _set_wallref_default_data(self):
         """
@@ -601,6 +1131,76 @@ class Box():
                         )
 
 
+    def __getstate__(self):
+        # the registry is rebuilt on demand, don't store it in snapshots
+        state = self.__dict__.copy()
+        state['registry'] = None
+        return state
+
+    def clone(self):
+        """
+        Copy the configured box tree this box belongs to, eg. to derive
+        variants of a design without configuring it again. Returns the copy of
+        this box.
+
+        All walls, edges, references, counterparts and children are copied
+        and linked to each other like in the original tree. Edge elements,
+        tooth layouts and rendered walls are shared until a wall or edge of
+        either tree is changed, so unchanged walls of a clone render without
+        any work.
+        """
+
+        return clone.clone(self)
+
+    def dumps(self):
+        """
+        Serialize this box's whole tree into a compressed, versioned snapshot.
+
+        Snapshots store the configured state, including walls, edges, edge
+        elements, counterparts and children, so loading them doesn't need to
+        configure again. Render caches are not stored.
+
+        Snapshots are pickles, only load snapshots from trusted sources.
+        """
+
+        return snapshot.dumps(self)
+
+    @staticmethod
+    def loads(data, extra_classes=()):
+        """
+        Load a box from a snapshot created by `dumps`.
+
+        Raises a ValueError if the snapshot was created by an incompatible
+        version.
+
+        Snapshots are pickles, only load snapshots from trusted sources.
+        Loading is restricted to LaserGen, numpy and basic builtin types, but
+        still runs their constructors with data from the snapshot. Own
+        classes used in the box, eg. `PlanarObject` subclasses added to
+        walls, have to be allowed by passing them in `extra_classes`.
+        """
+
+        return snapshot.loads(data, extra_classes)
+
+    def save(self, filename):
+        """
+        Write a snapshot of this box to a file, see `dumps`.
+        """
+
+        with open(filename, 'wb') as f:
+            f.write(self.dumps())
+
+    @staticmethod
+    def load(filename, extra_classes=()):
+        """
+        Load a box from a snapshot file written by `save`.
+
+        Only load snapshot files from trusted sources, see `loads`.
+        """
+
+        with open(filename, 'rb') as f:
+            return Box.loads(f.read(), extra_classes)
+
     def __str__(self):
         return '[Box "{name}" ({sx}, {sy}, {sz}) / ({asx}, {asy}, {asz})]'.format(
                 name = self.name,
@@ -655,16 +1255,241 @@ class SubBox(Box):
         self.abs_size = np.array([None, None, None])
 
         self.subboxes = []
+        self.parent = None
+        self.registry = None
 
         if name is None:
             self.name = type(self).__name__
         else:
             self.name = name
 
-    def _construct_rec(self, config):
+    def _construct(self, config):
         # subboxes don't have a `_construct_walls` method
         self._set_subbox_positions(config)
         self._construct_subwalls(config)
 
-        for c in self.subboxes:
-            c._construct_rec(config)
+
+class BoxRegistry():
+    """
+    Flat index of a configured box tree's walls and edges.
+
+    Built by `configure` on the root box and available as its `registry`
+    attribute. Subboxes share the registry of their root box.
+
+    Walls are stored as placements, tuples of the wall, its 3D position and
+    its direction as seen from the owning box, in render order. Walls shared
+    by several boxes are listed once, for the first box.
+
+    Edges comprise the edges of all walls and the cutout edges added by
+    subdividing. Edges added manually as wall children are not included.
+    """
+
+    def __init__(self, box, config):
+
+        self.fingerprint = config.fingerprint()
+
+        # placements of all boxes, including duplicates, in depth first order
+        self._gathered = []
+
+        # box -> (start, end) of the box's subtree in `_gathered`
+        self._ranges = {}
+
+        # box -> placements of the box's own walls
+        self._own_placements = {}
+
+        self._boxes = {}
+
+        boxes = box._get_boxes()
+
+        for b in boxes:
+            own = b._gather_own_walls(config)
+            self._ranges[b] = (len(self._gathered), None)
+            self._own_placements[b] = own
+            self._gathered.extend(own)
+            self._boxes.setdefault(b.name, b)
+
+        # a subtree ends where its last subbox's subtree ends
+        for b in reversed(boxes):
+            start = self._ranges[b][0]
+            end = self._ranges[b.subboxes[-1]][1] if b.subboxes else start + len(self._own_placements[b])
+            self._ranges[b] = (start, end)
+
+        self._root = box
+        self.placements = self._unique(self._gathered)
+
+        self._walls = {}
+        self._by_direction = {}
+
+        for b in boxes:
+            for d in DIR.DIRS:
+                wref = b.get_wall_by_direction(d)
+                if wref is not None:
+                    self._walls.setdefault(wref.name, wref)
+                    self._walls.setdefault(wref.dereference().name, wref)
+
+        for placement in self.placements:
+            self._by_direction.setdefault(DIR.code(placement[2]), []).append(placement)
+
+        self.edges = []
+
+        # edge names, built on first lookup, see `get_edge`
+        self._edges = None
+
+        seen = set()
+
+        def add_edge(e):
+            e = e.dereference()
+            if e not in seen:
+                seen.add(e)
+                self.edges.append(e)
+
+        for wall, _, _ in self.placements:
+            for e in wall.edges:
+                add_edge(e)
+
+        for b in boxes:
+            for e in getattr(b, '_cutout_edges', []):
+                add_edge(e)
+
+    @staticmethod
+    def _unique(placements):
+
+        # uniquify wall references, keep order for deterministic output
+        seen = set()
+        return [(w,p,d) for w,p,d in placements if not (w in seen or seen.add(w))]
+
+    def get_placements(self, box=None):
+        """
+        Return the placements of the given box's and its subboxes' walls,
+        default is the whole tree.
+        """
+
+        if box is None or box is self._root:
+            return self.placements
+
+        start, end = self._ranges[box]
+        return self._unique(self._gathered[start:end])
+
+    def get_box(self, name):
+        """
+        Return the box or subbox with the given name.
+        """
+
+        return self._boxes[name]
+
+    def get_wall(self, name):
+        """
+        Return a wall reference by its own name or its wall's name, eg.
+        `'RootBox.DIRX0.LEFT'` or `'RootBox.SUBX0'`.
+        """
+
+        return self._walls[name]
+
+    def get_box_walls(self, box):
+        """
+        Return the placements of a box's own walls, given the box or its name.
+        """
+
+        if isinstance(box, str):
+            box = self._boxes[box]
+
+        return self._own_placements[box]
+
+    def get_walls_by_direction(self, v):
+        """
+        Return the placements of all walls lying in the given direction of
+        their box.
+        """
+
+        return self._by_direction.get(DIR.code(v), [])
+
+    def get_edge(self, name):
+        """
+        Return an edge by the name used in diagnostics, see `Edge.get_name`.
+
+        If several edges share a name, the first one is returned.
+        """
+
+        if self._edges is None:
+            self._edges = {}
+            for e in self.edges:
+                self._edges.setdefault(e.get_name(), e)
+
+        return self._edges[name]
+
+
+def _copy_geometry(old, new, seen, walls):
+    """
+    Internal, for `Box.set_size`.
+
+    Copy sizes, positions and lengths from a newly constructed wall, edge or
+    reference into the existing object it replaces, following references,
+    edges and counterparts. Both objects must have been constructed the same
+    way, only with different sizes.
+
+    Changed walls and edges get their revision bumped, all walls visited are
+    added to `walls`.
+    """
+
+    stack = [(old, new)]
+
+    while stack:
+
+        old, new = stack.pop()
+
+        if old is new or old is None or id(old) in seen:
+            continue
+
+        assert type(old) is type(new)
+        seen.add(id(old))
+
+        if isinstance(old, WallReference):
+            old.position = new.position
+            old.size = new.size
+
+            stack.append((old.target, new.target))
+
+            for index, (old_edge, new_edge) in enumerate(zip(old.edges, new.edges)):
+
+                # whether a reference reaches the target's edges may change
+                # with its size
+                if (old_edge is None) != (new_edge is None):
+                    old.edges[index] = new_edge
+                else:
+                    stack.append((old_edge, new_edge))
+
+        elif isinstance(old, Wall):
+            walls.add(old)
+
+            if (old.size != new.size).any():
+                old.size = new.size
+                old._revision += 1
+
+            stack.extend(zip(old.edges, new.edges))
+
+        elif isinstance(old, EdgeReference):
+            old.position = new.position
+            old.length = new.length
+
+            stack.append((old.target, new.target))
+            stack.append((old.counterpart, new.counterpart))
+
+        elif isinstance(old, Edge):
+
+            if old.length != new.length:
+                old.length = new.length
+                old._revision += 1
+
+            # position of cutout edges inside their parent wall
+            if old.parent is not None:
+                old.position = new.position
+
+            stack.append((old.counterpart, new.counterpart))
+            stack.append((old.begin_corner_counterpart, new.begin_corner_counterpart))
+            stack.append((old.end_corner_counterpart, new.end_corner_counterpart))
+
+            if old.parent is not None:
+                walls.add(old.parent.dereference())
+
+        else:
+            assert False
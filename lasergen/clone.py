@@ -0,0 +1,105 @@
+"""
+Copy-on-write cloning of configured boxes, see `Box.clone`.
+
+Cloning copies every LaserGen object of a box tree (boxes, walls, edges,
+references, wall children, primitives added to walls), re-linking
+references, counterparts and parents to the copies. Data that only changes by being replaced is shared instead of
+copied: the edges' sub element lists, which are copied by the first edge
+adding an element afterwards, and the cached tooth layouts and rendered
+walls, which stay valid until a wall or edge of either tree is changed.
+"""
+
+import copy
+
+import numpy as np
+
+from .primitive import Primitive2D
+from .snapshot import _is_entry_type
+from .util import gc_paused
+
+
+# attributes shared between an object and its clone
+_SHARED = frozenset([
+        '_render_cache',
+        '_element_list_cache',
+        'sub_elements',
+    ])
+
+
+def clone(obj):
+    """
+    Copy an object and all LaserGen objects it references.
+
+    Returns the copy of `obj`.
+    """
+
+    copies = {}
+    todo = []
+    entry_types = {}
+
+    def get_copy(o):
+
+        c = copies.get(id(o))
+
+        if c is None:
+            c = copies[id(o)] = type(o).__new__(type(o))
+            todo.append((o, c))
+
+        return c
+
+    def get_primitive_copy(p):
+
+        # primitives are immutable, apart from their parent
+        c = copies.get(id(p))
+
+        if c is None:
+            c = copies[id(p)] = copy.copy(p)
+            object.__setattr__(c, 'parent', convert(p.parent))
+            object.__setattr__(c, 'own_position', convert(p.own_position))
+
+        return c
+
+    def convert(v):
+
+        cls = type(v)
+        is_entry = entry_types.get(cls)
+
+        if is_entry is None:
+            is_entry = entry_types[cls] = _is_entry_type(cls)
+
+        if is_entry:
+            return get_copy(v)
+        if isinstance(v, Primitive2D) and v.parent is not None:
+            return get_primitive_copy(v)
+        if cls is list:
+            return [convert(e) for e in v]
+        if cls is tuple:
+            return tuple(convert(e) for e in v)
+        if cls is dict:
+            return {convert(k): convert(e) for k, e in v.items()}
+        if cls is np.ndarray:
+            # arrays are partly updated in place, eg. a box's `abs_size`
+            return v.copy()
+
+        return v
+
+    with gc_paused():
+
+        get_copy(obj)
+
+        while todo:
+            o, c = todo.pop()
+
+            state = {}
+
+            for name, v in o.__dict__.items():
+                state[name] = v if name in _SHARED else convert(v)
+
+            c.__dict__.update(state)
+
+            # the edge whichever adds an element first copies the shared list
+            if 'sub_elements' in state:
+                o._elements_shared = True
+                c._elements_shared = True
+
+    return copies[id(obj)]
@@ -12,6 +12,9 @@ class Config():
     print_wall_names = True
     warn_for_unclosed_paths = True
 
+    # a `diagnostics.Diagnostics` sink, print diagnostics right away if None
+    diagnostics = None
+
     def __init__(self, tooth_min_width, tooth_max_width, wall_thickness, object_distance, cutting_width=0):
         self.tooth_min_width = tooth_min_width
         self.tooth_max_width = tooth_max_width
@@ -34,11 +37,33 @@ class Config():
         n.abort_on_tooth_length_error = self.abort_on_tooth_length_error
         n.print_wall_names            = self.print_wall_names
         n.warn_for_unclosed_paths     = self.warn_for_unclosed_paths
+        n.diagnostics                 = self.diagnostics
 
         n.colors = self.colors.copy()
 
         return n
 
+    def fingerprint(self):
+        """
+        Return a hashable value identifying all settings of this config.
+
+        Configs with equal fingerprints produce identical output, so the
+        fingerprint can be used as cache key for rendering results.
+        """
+
+        return (
+                self.tooth_min_width,
+                self.tooth_max_width,
+                self.wall_thickness,
+                self.subwall_thickness,
+                self.cutting_width,
+                self.object_distance,
+                self.abort_on_tooth_length_error,
+                self.print_wall_names,
+                self.warn_for_unclosed_paths,
+                tuple(sorted(self.colors.items())),
+            )
+
     def get_color_from_layer(self, layer):
 
         if layer.warn_level is not None:
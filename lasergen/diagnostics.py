@@ -0,0 +1,229 @@
+import contextlib
+import sys
+
+import numpy as np
+
+
+class DIAGNOSTIC():
+    """
+    Codes identifying the kind of a diagnostic record.
+    """
+
+    TOOTH_LENGTH = 'tooth_length'
+    COUNTERPART_COUNT = 'counterpart_count'
+    COUNTERPART_POSITION = 'counterpart_position'
+    COUNTERPART_LENGTH = 'counterpart_length'
+    COUNTERPART_STYLE = 'counterpart_style'
+    CORNER_STYLE = 'corner_style'
+    UNCLOSED_PATH = 'unclosed_path'
+
+
+class Diagnostic():
+    """
+    A single diagnostic record.
+
+    `level` is `'warn'` or `'error'`, like the warn level of layers. `source`
+    names the wall or edge the problem was found in, `position` is the
+    position along the edge (or on the wall) and `values` holds the values
+    that failed the check.
+    """
+
+    __slots__ = ('level', 'code', 'message', 'source', 'position', 'values')
+
+    def __init__(self, level, code, message, source=None, position=None, values=()):
+        self.level = level
+        self.code = code
+        self.message = message
+        self.source = source
+        self.position = position
+        self.values = tuple(values)
+
+    def key(self):
+        """
+        Tuple identifying this record, used for deduplication.
+        """
+
+        return (self.level, self.code, self.source, self.position, self.values)
+
+    def __str__(self):
+
+        where = []
+
+        if self.source is not None:
+            where.append(self.source)
+        if self.position is not None:
+            where.append('at {}'.format(self.position))
+
+        if not where:
+            return self.message
+
+        return '{} [{}]'.format(self.message, ' '.join(where))
+
+    def __repr__(self):
+        return 'Diagnostic({!r}, {!r}, {!r}, source={!r}, position={!r}, values={!r})'.format(
+                self.level,
+                self.code,
+                self.message,
+                self.source,
+                self.position,
+                self.values,
+            )
+
+
+class Diagnostics():
+    """
+    A sink collecting diagnostic records.
+
+    Set it as `diagnostics` attribute of a `Config` to collect the warnings
+    and errors found while rendering and exporting, instead of printing them
+    as they occur. Equal records are stored once and counted.
+
+    If `echo` is True each new record is printed when it is first reported,
+    otherwise nothing is printed until `print_summary` is called.
+    """
+
+    def __init__(self, echo=False):
+        self.echo = echo
+        self._records = {}
+        self._counts = {}
+
+    def add(self, record):
+        """
+        Add a record, or increase the count of an equal record.
+        """
+
+        key = record.key()
+
+        if key in self._records:
+            self._counts[key] += 1
+            return
+
+        self._records[key] = record
+        self._counts[key] = 1
+
+        if self.echo:
+            print(record)
+
+    @property
+    def records(self):
+        """
+        A list of all distinct records, in the order they were first reported.
+        """
+
+        return list(self._records.values())
+
+    def count(self, record):
+        """
+        Return how often the given record was reported.
+        """
+
+        return self._counts.get(record.key(), 0)
+
+    def filter(self, level=None, code=None):
+        """
+        Return all distinct records matching the given level and code.
+        """
+
+        return [r for r in self._records.values() if (level is None or r.level == level) and (code is None or r.code == code)]
+
+    def has_errors(self):
+        return any(r.level == 'error' for r in self._records.values())
+
+    def clear(self):
+        self._records = {}
+        self._counts = {}
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __len__(self):
+        return len(self._records)
+
+    def print_summary(self, file=None):
+        """
+        Print all collected records with their counts at once.
+        """
+
+        if file is None:
+            file = sys.stdout
+
+        lines = []
+
+        for key, record in self._records.items():
+            count = self._counts[key]
+            lines.append(str(record) if count == 1 else '{} ({}x)'.format(record, count))
+
+        if lines:
+            file.write('\n'.join(lines) + '\n')
+
+
+# active captures, innermost last, see `capture`
+_captures = []
+
+def report(config, level, code, message, source=None, position=None, values=()):
+    """
+    Report a diagnostic to the sink configured in `config.diagnostics`.
+
+    Without a sink the message is printed right away. Numpy arrays and
+    scalars in `position` and `values` are converted to plain floats and
+    float tuples, so records can be compared and hashed.
+    """
+
+    record = Diagnostic(level, code, message, source, _plain(position), [_plain(v) for v in values])
+    _emit(config, record, True)
+    return record
+
+@contextlib.contextmanager
+def capture(mute=False):
+    """
+    Context manager collecting all records reported within into a list.
+
+    Used by render caches to store the records belonging to a cached result,
+    see `replay`. Records are still passed on to the sink, unless `mute` is
+    True.
+    """
+
+    records = []
+    _captures.append((records, mute))
+
+    try:
+        yield records
+    finally:
+        _captures.pop()
+
+def replay(config, records, echo=False):
+    """
+    Report previously captured records again.
+
+    Without a sink the records are only printed if `echo` is True, so cached
+    results don't repeat their messages on the console.
+    """
+
+    for record in records:
+        _emit(config, record, echo)
+
+def _plain(v):
+    """
+    Convert numpy arrays to tuples of floats and numpy scalars to python
+    numbers, recursing into tuples and lists.
+    """
+
+    if isinstance(v, np.ndarray):
+        return tuple(float(x) for x in v.ravel())
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, (tuple, list)):
+        return tuple(_plain(e) for e in v)
+    return v
+
+def _emit(config, record, echo):
+
+    for records, mute in reversed(_captures):
+        records.append(record)
+        if mute:
+            return
+
+    if config.diagnostics is not None:
+        config.diagnostics.add(record)
+    elif echo:
+        print(record.message)
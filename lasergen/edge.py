@@ -1,11 +1,14 @@
-import collections
-import numpy as np
+import bisect
+import collections.abc
 import math
+import numpy as np
 
+from . import diagnostics
+from .diagnostics import DIAGNOSTIC
 from .layer import Layer
 from .units import Frac
 from .util import DIR2, almost_equal
-from .primitive import Object2D, PlanarObject, Line
+from .primitive import Object2DBuilder, PlanarObject
 
 
 # Edge Styles:
@@ -197,6 +200,100 @@ class _EdgeElement():
             )
 
 
+class _EdgeElementList():
+    """
+    Internal. An edge's sub elements, always sorted by position.
+
+    Insertion uses binary search and rejects elements overlapping existing
+    ones, so the list never needs to be sorted or checked again. Elements may
+    touch, ie. one may begin where the previous one ends.
+    """
+
+    def __init__(self):
+        self._elements = []
+        self._positions = []
+        self._ends = []
+
+    def __iter__(self):
+        return iter(self._elements)
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __getitem__(self, index):
+        return self._elements[index]
+
+    def add(self, element):
+        """
+        Insert an element at its sorted position.
+
+        Raises a ValueError naming the colliding elements if the new element
+        overlaps an existing one.
+        """
+
+        pos = element.pos
+        end = element.pos + element.length
+
+        if element.length < 0:
+            raise ValueError('Edge element {} has negative length.'.format(element))
+
+        # insert after elements with the same position, like a stable sort
+        i = bisect.bisect_right(self._positions, pos)
+
+        if i > 0 and self._ends[i-1] > pos:
+            raise ValueError('Edge element {} overlaps {}.'.format(element, self._elements[i-1]))
+
+        if i < len(self._elements) and end > self._positions[i]:
+            raise ValueError('Edge element {} overlaps {}.'.format(element, self._elements[i]))
+
+        self._elements.insert(i, element)
+        self._positions.insert(i, pos)
+        self._ends.insert(i, end)
+
+    def remove(self, element):
+        """
+        Remove the given element object.
+        """
+
+        i = bisect.bisect_left(self._positions, element.pos)
+
+        while self._elements[i] is not element:
+            i += 1
+
+        del self._elements[i]
+        del self._positions[i]
+        del self._ends[i]
+
+    def get_range(self, pos, length):
+        """
+        Return all elements intersecting the range `[pos, pos + length)`, in
+        order. Zero-length elements are included if their position lies in
+        the range.
+        """
+
+        end = pos + length
+
+        i = bisect.bisect_left(self._ends, pos)
+        j = bisect.bisect_left(self._positions, end)
+
+        # skip elements just touching the range's begin
+        while i < j and self._ends[i] == pos and self._positions[i] < pos:
+            i += 1
+
+        return self._elements[i:j]
+
+    def copy(self):
+        """
+        Return a copy of this list, sharing the elements.
+        """
+
+        l = _EdgeElementList()
+        l._elements = self._elements.copy()
+        l._positions = self._positions.copy()
+        l._ends = self._ends.copy()
+        return l
+
+
 class Edge(PlanarObject):
     """
     A 2D object representing a wall's edge.
@@ -206,10 +303,22 @@ class Edge(PlanarObject):
     Always renders into positive X or Y direction. The direction in which
     extending teeth are rendered is controlled by the outward_dir parameter.
     This one also controls the general rendering direction of the edge.
+
+    The prepared element list (including tooth layout) and the rendered
+    Object2D are cached per config fingerprint. Every method changing the edge
+    bumps its `_revision`, which invalidates the caches. The render cache is
+    invalidated by changes to the counterparts, too. Diagnostics reported
+    while filling a cache are stored with it and reported again on cache hits.
     """
 
     _data_to_local_coords = ['outward_dir']
 
+    # the wall owning this edge, set by the wall
+    wall = None
+
+    # whether `sub_elements` is shared with a clone, see `Box.clone`
+    _elements_shared = False
+
     def __init__(self, length, outward_dir, begin_style=EDGE_STYLE.FLAT, end_style=EDGE_STYLE.FLAT, style=EDGE_ELEMENT_STYLE.TOOTHED, layer=Layer('outline')):
         super(Edge, self).__init__(layer)
 
@@ -223,8 +332,18 @@ class Edge(PlanarObject):
         self.begin_corner_counterpart = None
         self.end_corner_counterpart = None
 
-        self.sub_elements = []
+        self.sub_elements = _EdgeElementList()
 
+        self._revision = 0
+        self._element_list_cache = None
+        self._render_cache = None
+
+    def __getstate__(self):
+        # caches are recalculated on demand, don't store them in snapshots
+        state = self.__dict__.copy()
+        state['_element_list_cache'] = None
+        state['_render_cache'] = None
+        return state
 
     def add_element(self, pos, length, style, begin_style=None, end_style=None, prev_style=None, next_style=None, auto_add_counterpart=True):
         """
@@ -232,20 +351,40 @@ class Edge(PlanarObject):
         is True a corresponding edge element is also added to this edge's
         counterpart. In this case an exception is raised, if no counterpart is
         configured.
+
+        Raises a ValueError if the element doesn't fit into the edge or
+        overlaps an existing element. If the counterpart element is rejected,
+        this edge is left unchanged.
         """
 
         assert begin_style is None or begin_style in _EdgeElement.allowed_end_styles[style]
         assert end_style   is None or end_style   in _EdgeElement.allowed_end_styles[style]
 
         new_element = _EdgeElement(pos, length, style, begin_style, end_style, prev_style, next_style)
-        self.sub_elements.append(new_element)
 
-        # add counterpart with matching styles
+        if pos < 0 or pos + length > self.length:
+            raise ValueError('Edge element {} exceeds edge length {}.'.format(new_element, self.length))
+
         if auto_add_counterpart:
             assert self.counterpart is not None
 
+        if self._elements_shared:
+            self.sub_elements = self.sub_elements.copy()
+            self._elements_shared = False
+
+        self.sub_elements.add(new_element)
+
+        # add counterpart with matching styles
+        if auto_add_counterpart:
             cp = new_element.get_counterpart_element()
-            self.counterpart.add_element(cp.pos, cp.length, cp.style, cp.begin_style, cp.end_style, cp.prev_style, cp.next_style, False)
+
+            try:
+                self.counterpart.add_element(cp.pos, cp.length, cp.style, cp.begin_style, cp.end_style, cp.prev_style, cp.next_style, False)
+            except ValueError:
+                self.sub_elements.remove(new_element)
+                raise
+
+        self._revision += 1
 
     def set_style(self, style, set_counterpart=True):
         """
@@ -255,6 +394,7 @@ class Edge(PlanarObject):
         """
 
         self.style = style
+        self._revision += 1
 
         if set_counterpart:
             assert self.counterpart is not None
@@ -266,6 +406,24 @@ class Edge(PlanarObject):
             elif style == EDGE_ELEMENT_STYLE.TOOTHED:
                 self.counterpart.set_style(EDGE_ELEMENT_STYLE.TOOTHED, set_counterpart=False)
 
+    def get_elements(self, pos=0, length=None):
+        """
+        Return the sub elements intersecting the given range of this edge,
+        sorted by position.
+
+        The returned elements are copies with positions relative to `pos`.
+        """
+
+        if length is None:
+            length = self.length - pos
+
+        elements = [e.copy() for e in self.sub_elements.get_range(pos, length)]
+
+        for e in elements:
+            e.pos -= pos
+
+        return elements
+
     def get_corner_style_by_direction(self, direction):
         """
         Returns the edge's corner style in a given direction.
@@ -305,6 +463,7 @@ class Edge(PlanarObject):
         else:
             raise ValueError('Wrong direction given.')
 
+        self._revision += 1
 
         if set_counterpart:
 
@@ -342,6 +501,7 @@ class Edge(PlanarObject):
         assert self.length == counterpart.length
 
         self.counterpart = counterpart.get_reference()
+        self._revision += 1
 
         if backreference:
             counterpart.set_counterpart(self, False)
@@ -390,8 +550,69 @@ class Edge(PlanarObject):
         else:
             raise ValueError('Wrong direction given.')
 
+        self._revision += 1
+
 
     def render(self, config):
+        """
+        Render into an Object2D, reusing the last result if neither the config
+        nor this edge or its counterparts changed since.
+        """
+
+        key = self._render_key(config.fingerprint())
+
+        if self._render_cache is None or self._render_cache[0] != key:
+            with diagnostics.capture() as records:
+                rendered = self._render(config)
+            self._render_cache = (key, rendered, records)
+
+        else:
+            diagnostics.replay(config, self._render_cache[2])
+
+        return self._render_cache[1]._copy()
+
+    def get_name(self):
+        """
+        Return a name identifying this edge in diagnostics, made of the
+        owning wall's name and the edge's outward direction.
+        """
+
+        c = DIR2.code(self.outward_dir)
+        direction = DIR2.NAMES[c] if c is not None else str(self.outward_dir)
+
+        if self.wall is not None:
+            return '{}.{}'.format(self.wall.name, direction)
+
+        if self.parent is not None:
+            return '{}.{}.{}'.format(self.parent.dereference().name, type(self).__name__, direction)
+
+        return '{}.{}'.format(type(self).__name__, direction)
+
+    def _render_key(self, fingerprint):
+        """
+        Return a key identifying everything this edge's rendering depends on:
+        the config fingerprint and the revisions of this edge and its
+        counterparts.
+        """
+
+        return (
+                fingerprint,
+                self._revision,
+                self._get_revision(self.counterpart),
+                self._get_revision(self.begin_corner_counterpart),
+                self._get_revision(self.end_corner_counterpart),
+            )
+
+    @staticmethod
+    def _get_revision(edge):
+        if edge is None:
+            return None
+        return edge.dereference()._revision
+
+    def _render(self, config):
+        """
+        Internal, uncached implementation of `render`.
+        """
 
         start = np.array([0,0])
 
@@ -402,16 +623,84 @@ class Edge(PlanarObject):
         displace = config.get_displacement_from_layer(self.layer)
         wall_thickness = config.wall_thickness
 
-        elements = self._prepare_element_list(config)
+        # the checks below update the elements' layers, work on copies
+        elements = [e.copy() for e in self._get_prepared_element_list(config)]
+
+        # diagnostics of the element list preparation belong to the rendering
+        diagnostics.replay(config, self._element_list_cache[2], echo=True)
 
         self._check_counterpart_elements_matching(elements, config)
         self._check_corner_counterpart_styles_matching(elements, config)
 
-        return sum(
-                (self._render_element(start, direction, self.outward_dir, displace, wall_thickness, config, p) for p in elements),
-                Object2D()
+        # the builder joins the teeth's outlines into polylines, and slots
+        # into polygons
+        builder = Object2DBuilder()
+
+        for p in elements:
+            self._render_element(builder, start, direction, self.outward_dir, displace, wall_thickness, config, p)
+
+        return builder.build()
+
+
+    def _get_prepared_element_list(self, config):
+        """
+        Cached version of `_prepare_element_list`.
+
+        The returned list and its elements are shared between calls and must
+        not be modified.
+
+        Diagnostics reported while preparing the list are not passed on, but
+        stored in the cache, see `render`.
+        """
+
+        key = (config.fingerprint(), self._revision)
+
+        if self._element_list_cache is None or self._element_list_cache[0] != key:
+            with diagnostics.capture(mute=True) as records:
+                elements = self._prepare_element_list(config)
+            self._element_list_cache = (key, elements, records)
+
+        return self._element_list_cache[1]
+
+    @staticmethod
+    def _prepare_element_lists(edges, config):
+        """
+        Fill the prepared element list caches of all given edges at once.
+
+        Tooth counts for all toothed segments of all edges are calculated in a
+        single call to `_solve_tooth_counts`. Edges with valid caches are
+        skipped.
+        """
+
+        fingerprint = config.fingerprint()
+
+        todo = []
+        seen = set()
+
+        for e in edges:
+            if id(e) in seen:
+                continue
+            seen.add(id(e))
+
+            if e._element_list_cache is None or e._element_list_cache[0] != (fingerprint, e._revision):
+                todo.append((e, e._prepare_segment_list()))
+
+        toothed = [el for _, segments in todo for el in segments if el.style == EDGE_ELEMENT_STYLE.TOOTHED]
+
+        tooth_counts = Edge._solve_tooth_counts(
+                config,
+                [el.length for el in toothed],
+                [Edge._is_odd_tooth_count(el) for el in toothed],
             )
 
+        offset = 0
+
+        for e, segments in todo:
+            count = sum(1 for el in segments if el.style == EDGE_ELEMENT_STYLE.TOOTHED)
+            with diagnostics.capture(mute=True) as records:
+                elements = e._convert_toothed_elements(segments, config, tooth_counts[offset:offset+count])
+            e._element_list_cache = ((fingerprint, e._revision), elements, records)
+            offset += count
 
     def _prepare_element_list(self, config):
         """
@@ -420,8 +709,17 @@ class Edge(PlanarObject):
         intermediate elements.
         """
 
-        sub_elements = sorted(self.sub_elements, key=lambda x: x.pos)
-        self._check_sub_element_list_non_overlapping(sub_elements)
+        return self._convert_toothed_elements(self._prepare_segment_list(), config)
+
+    def _prepare_segment_list(self):
+        """
+        First part of `_prepare_element_list`, which doesn't depend on the
+        config. Returns the element list before toothed elements are converted
+        into teeth.
+        """
+
+        sub_elements = self.sub_elements
+        self._check_sub_element_list_bounds(sub_elements)
 
 
         elements = [_EdgeElement(0, None, self.style, self.begin_style, None, None, None)]
@@ -443,27 +741,22 @@ class Edge(PlanarObject):
 
         elements = self._remove_empty_elements(elements)
         elements = self._calculate_element_edge_styles(elements)
-        elements = self._convert_toothed_elements(elements, config)
 
         return elements
 
-    def _check_sub_element_list_non_overlapping(self, sub_elements):
-        """
-        Check whether the given sub elements list contains no overlapping
-        elements and the elements are contained in self's dimensions. The given
-        list must be sorted.
+    def _check_sub_element_list_bounds(self, sub_elements):
         """
+        Check whether the given sorted, non-overlapping sub elements are
+        contained in self's dimensions.
 
-        element_positions = []
-
-        for e in sub_elements:
-            element_positions.append(e.pos)
-            element_positions.append(e.pos + e.length)
-
-        element_positions = [0] + element_positions + [self.length]
+        Overlaps are already rejected by `add_element`, but the edge length
+        may have changed since. Raises a ValueError in this case.
+        """
 
-        # the resulting list must be sorted
-        assert all(element_positions[i] <= element_positions[i+1] for i in range(len(element_positions)-1))
+        if len(sub_elements):
+            assert sub_elements[0].pos >= 0
+            if sub_elements[-1].pos + sub_elements[-1].length > self.length:
+                raise ValueError('Edge element {} exceeds edge length {}.'.format(sub_elements[-1], self.length))
 
 
     @staticmethod
@@ -571,12 +864,27 @@ class Edge(PlanarObject):
         return elements
 
 
-    def _convert_toothed_elements(self, elements, config):
+    def _convert_toothed_elements(self, elements, config, tooth_counts=None):
         """
         Convert all toothed edge elements in the list into their corresponding
         list of teeth given by FLAT / FLAT_EXTENDED edge elements.
+
+        `tooth_counts` optionally gives the tooth count for each toothed
+        element, as calculated by `_solve_tooth_counts`. If not given, the
+        counts are calculated here.
         """
 
+        toothed = [e for e in elements if e.style == EDGE_ELEMENT_STYLE.TOOTHED]
+
+        if tooth_counts is None:
+            tooth_counts = self._solve_tooth_counts(
+                    config,
+                    [e.length for e in toothed],
+                    [self._is_odd_tooth_count(e) for e in toothed],
+                )
+
+        tooth_counts = iter(tooth_counts)
+
         l = []
 
         for e in elements:
@@ -585,16 +893,36 @@ class Edge(PlanarObject):
                 l.append(e)
 
             else:
-                l.extend(self._prepare_toothed_element(e, config))
+                l.extend(self._prepare_toothed_element(e, config, next(tooth_counts)))
 
         return l
 
-    def _prepare_toothed_element(self, element, config):
+    @staticmethod
+    def _is_begin_outward(element):
+        """
+        Whether a toothed element's first tooth extends outward.
+        """
+        return element.begin_style in [EDGE_STYLE.TOOTHED, EDGE_STYLE.EXTENDED, EDGE_STYLE.INTERNAL_OUTWARD]
+
+    @staticmethod
+    def _is_odd_tooth_count(element):
+        """
+        Whether a toothed element needs an odd number of teeth to match its
+        begin and end styles.
+        """
+
+        begin_outward = Edge._is_begin_outward(element)
+        end_outward = element.end_style in [EDGE_STYLE.TOOTHED, EDGE_STYLE.EXTENDED, EDGE_STYLE.INTERNAL_OUTWARD]
+
+        return (begin_outward and end_outward) or (not begin_outward and not end_outward)
+
+    def _prepare_toothed_element(self, element, config, tooth_count=None):
         """
         Convert a single toothed edge element into its corresponding list of
         teeth given by FLAT / FLAT_EXTENDED edge elements.
 
-        This is where tooth length calculation is done.
+        This is where tooth length calculation is done, unless a precalculated
+        `tooth_count` is given.
         """
 
         assert element.style == EDGE_ELEMENT_STYLE.TOOTHED
@@ -606,13 +934,11 @@ class Edge(PlanarObject):
         assert end_style != EDGE_STYLE.OUTWARD
 
         # calculate parity
-        begin_outward = begin_style in [EDGE_STYLE.TOOTHED, EDGE_STYLE.EXTENDED, EDGE_STYLE.INTERNAL_OUTWARD]
-        end_outward = end_style in [EDGE_STYLE.TOOTHED, EDGE_STYLE.EXTENDED, EDGE_STYLE.INTERNAL_OUTWARD]
-
-        odd_tooth_count = (begin_outward and end_outward) or (not begin_outward and not end_outward)
+        begin_outward = self._is_begin_outward(element)
 
         # calculate tooth length
-        tooth_count = self._get_tooth_count(config, length, odd_tooth_count)
+        if tooth_count is None:
+            tooth_count = self._get_tooth_count(config, length, self._is_odd_tooth_count(element))
         tooth_length = length / tooth_count
 
         tooth_length_satisfied = config.tooth_min_width <= tooth_length <= config.tooth_max_width
@@ -625,29 +951,30 @@ class Edge(PlanarObject):
                     len = tooth_length,
                 )
             layer = Layer.warn(m)
-            print(m)
+            diagnostics.report(config, 'warn', DIAGNOSTIC.TOOTH_LENGTH, m, self.get_name(), element.pos,
+                    (config.tooth_min_width, tooth_length, config.tooth_max_width))
 
-        # prepare element data
-        tooth_positions = [0] + list(np.cumsum([tooth_length for i in range(tooth_count)]))
+        # prepare element data, positions are accumulated tooth by tooth
+        tooth_positions = element.pos + np.concatenate(([0], np.cumsum(np.full(tooth_count - 1, tooth_length))))
 
         if begin_outward:
-            style_list = [EDGE_ELEMENT_STYLE.FLAT_EXTENDED, EDGE_ELEMENT_STYLE.FLAT] * math.ceil(len(tooth_positions)/2)
+            styles = [EDGE_ELEMENT_STYLE.FLAT_EXTENDED, EDGE_ELEMENT_STYLE.FLAT]
         else:
-            style_list = [EDGE_ELEMENT_STYLE.FLAT, EDGE_ELEMENT_STYLE.FLAT_EXTENDED] * math.ceil(len(tooth_positions)/2)
+            styles = [EDGE_ELEMENT_STYLE.FLAT, EDGE_ELEMENT_STYLE.FLAT_EXTENDED]
 
-        tooth_data = zip(tooth_positions[:-1], style_list)
+        end_styles = [EDGE_STYLE.INTERNAL_FLAT if style == EDGE_ELEMENT_STYLE.FLAT else EDGE_STYLE.TOOTHED for style in styles]
 
         # construct elements
         elements = [_EdgeElement(
-                element.pos + pos,
+                pos,
                 tooth_length,
-                style,
-                EDGE_STYLE.INTERNAL_FLAT if style == EDGE_ELEMENT_STYLE.FLAT else EDGE_STYLE.TOOTHED,
-                EDGE_STYLE.INTERNAL_FLAT if style == EDGE_ELEMENT_STYLE.FLAT else EDGE_STYLE.TOOTHED,
+                styles[i % 2],
+                end_styles[i % 2],
+                end_styles[i % 2],
                 None,
                 None,
                 layer,
-            ) for pos, style in tooth_data]
+            ) for i, pos in enumerate(tooth_positions.tolist())]
 
         elements[0].begin_style = begin_style
         elements[-1].end_style = end_style
@@ -664,11 +991,12 @@ class Edge(PlanarObject):
         if self.counterpart is None:
             return
 
-        cp_elements = self.counterpart.dereference()._prepare_element_list(config)
+        cp_elements = self.counterpart.dereference()._get_prepared_element_list(config)
 
         if len(elements) != len(cp_elements):
             m = 'ERROR: Edge counterpart count mismatch, rendering into error layer.'
-            print(m)
+            diagnostics.report(config, 'error', DIAGNOSTIC.COUNTERPART_COUNT, m, self.get_name(), None,
+                    (len(elements), len(cp_elements)))
             for e in elements:
                 e.update_layer(Layer.error(m))
             return
@@ -678,32 +1006,28 @@ class Edge(PlanarObject):
             if not almost_equal(a.pos, b.pos):
                 m = 'ERROR: Edge element counterpart position mismatch, rendering into error layer.'
                 a.update_layer(Layer.error(m))
-                print(m)
+                diagnostics.report(config, 'error', DIAGNOSTIC.COUNTERPART_POSITION, m, self.get_name(), a.pos, (a.pos, b.pos))
                 continue
             if not almost_equal(a.length, b.length):
                 m = 'ERROR: Edge element counterpart length mismatch, rendering into error layer.'
                 a.update_layer(Layer.error(m))
-                print(m)
+                diagnostics.report(config, 'error', DIAGNOSTIC.COUNTERPART_LENGTH, m, self.get_name(), a.pos, (a.length, b.length))
                 continue
 
             if a.style == EDGE_ELEMENT_STYLE.FLAT:
-                if not b.style in [EDGE_ELEMENT_STYLE.FLAT_EXTENDED, EDGE_ELEMENT_STYLE.REMOVE]:
-                    m = 'ERROR: Edge element counterpart style mismatch, rendering into error layer.'
-                    a.update_layer(Layer.error(m))
-                    print(m)
+                allowed = [EDGE_ELEMENT_STYLE.FLAT_EXTENDED, EDGE_ELEMENT_STYLE.REMOVE]
             elif a.style == EDGE_ELEMENT_STYLE.FLAT_EXTENDED:
-                if not b.style in [EDGE_ELEMENT_STYLE.FLAT, EDGE_ELEMENT_STYLE.REMOVE]:
-                    m = 'ERROR: Edge element counterpart style mismatch, rendering into error layer.'
-                    a.update_layer(Layer.error(m))
-                    print(m)
+                allowed = [EDGE_ELEMENT_STYLE.FLAT, EDGE_ELEMENT_STYLE.REMOVE]
             elif a.style == EDGE_ELEMENT_STYLE.REMOVE:
-                if not b.style in [EDGE_ELEMENT_STYLE.FLAT, EDGE_ELEMENT_STYLE.FLAT_EXTENDED, EDGE_ELEMENT_STYLE.REMOVE]:
-                    m = 'ERROR: Edge element counterpart style mismatch, rendering into error layer.'
-                    a.update_layer(Layer.error(m))
-                    print(m)
+                allowed = [EDGE_ELEMENT_STYLE.FLAT, EDGE_ELEMENT_STYLE.FLAT_EXTENDED, EDGE_ELEMENT_STYLE.REMOVE]
             else:
                 assert False
 
+            if not b.style in allowed:
+                m = 'ERROR: Edge element counterpart style mismatch, rendering into error layer.'
+                a.update_layer(Layer.error(m))
+                diagnostics.report(config, 'error', DIAGNOSTIC.COUNTERPART_STYLE, m, self.get_name(), a.pos, (a.style, b.style))
+
     def _check_corner_counterpart_styles_matching(self, elements, config):
         """
         Check whether the neighbouring edges' corner styles match this edge's.
@@ -713,25 +1037,29 @@ class Edge(PlanarObject):
 
         if self.begin_corner_counterpart is not None:
 
-            if not self.begin_corner_counterpart.get_corner_style_by_direction(self.outward_dir) in _EdgeElement.allowed_neighbour_corner_styles[self.begin_style]:
+            cp_style = self.begin_corner_counterpart.get_corner_style_by_direction(self.outward_dir)
+
+            if not cp_style in _EdgeElement.allowed_neighbour_corner_styles[self.begin_style]:
                 m = 'ERROR: Edge corner counterpart style mismatch, rendering into error layer.'
                 elements[0].update_layer(Layer.error(m))
-                print(m)
+                diagnostics.report(config, 'error', DIAGNOSTIC.CORNER_STYLE, m, self.get_name(), 0, (self.begin_style, cp_style))
 
         if self.end_corner_counterpart is not None:
 
-            if not self.end_corner_counterpart.get_corner_style_by_direction(self.outward_dir) in _EdgeElement.allowed_neighbour_corner_styles[self.end_style]:
+            cp_style = self.end_corner_counterpart.get_corner_style_by_direction(self.outward_dir)
+
+            if not cp_style in _EdgeElement.allowed_neighbour_corner_styles[self.end_style]:
                 m = 'ERROR: Edge corner counterpart style mismatch, rendering into error layer.'
                 elements[-1].update_layer(Layer.error(m))
-                print(m)
+                diagnostics.report(config, 'error', DIAGNOSTIC.CORNER_STYLE, m, self.get_name(), self.length, (self.end_style, cp_style))
 
 
-    def _render_element(self, start, direction, outward_dir, displace, wall_thickness, config, element):
+    def _render_element(self, builder, start, direction, outward_dir, displace, wall_thickness, config, element):
         """
-        Render a single edge element into an Object2D.
+        Render a single edge element, adding its outline as paths to the
+        given Object2DBuilder.
         """
 
-        start = start + element.pos * direction
         length = element.length
         style = element.style
         begin_style, end_style = element.begin_style, element.end_style
@@ -740,15 +1068,14 @@ class Edge(PlanarObject):
         assert begin_style in _EdgeElement.allowed_end_styles[style]
         assert end_style   in _EdgeElement.allowed_end_styles[style]
 
+        point = self._element_point_function(start, direction, outward_dir, element)
+
         if style == EDGE_ELEMENT_STYLE.FLAT:
 
             s = -displace         if begin_style == EDGE_STYLE.FLAT else displace
             t = length + displace if end_style   == EDGE_STYLE.FLAT else length - displace
 
-            return Object2D([Line(
-                start + direction * s + outward_dir * displace,
-                start + direction * t + outward_dir * displace,
-                )], layer)
+            builder.add_path((point(s, displace), point(t, displace)), layer)
 
         elif style == EDGE_ELEMENT_STYLE.FLAT_EXTENDED:
 
@@ -762,33 +1089,45 @@ class Edge(PlanarObject):
             s = -pd[begin_style]
             t = length + pd[end_style]
 
-            l = []
+            path = []
 
             if begin_style == EDGE_STYLE.TOOTHED:
-                l.append(Line(
-                        start + direction * s + outward_dir * displace,
-                        start + direction * s + outward_dir * (wall_thickness + displace),
-                    ))
+                path.append(point(s, displace))
 
-            l.append(Line(
-                        start + direction * s + outward_dir * (wall_thickness + displace),
-                        start + direction * t + outward_dir * (wall_thickness + displace),
-                ))
+            path.append(point(s, wall_thickness + displace))
+            path.append(point(t, wall_thickness + displace))
 
             if end_style == EDGE_STYLE.TOOTHED:
-                l.append(Line(
-                        start + direction * t + outward_dir * (wall_thickness + displace),
-                        start + direction * t + outward_dir * displace,
-                    ))
+                path.append(point(t, displace))
 
-            return Object2D(l, layer)
+            builder.add_path(path, layer)
 
         elif style == EDGE_ELEMENT_STYLE.REMOVE:
-            return Object2D()
+            pass
 
         else:
             raise Exception("Invalid _EdgeElement for rendering.")
 
+    @staticmethod
+    def _element_point_function(start, direction, outward_dir, element):
+        """
+        Internal. Return a function mapping a distance along the edge from the
+        element's position, and a distance in outward direction, to a point
+        as a tuple of floats.
+
+        Works on plain floats, since rendering an edge computes many points
+        and numpy is slow for single 2D vectors.
+        """
+
+        sx, sy = (start + element.pos * direction).tolist()
+        dx, dy = direction.tolist()
+        ox, oy = np.asarray(outward_dir).tolist()
+
+        def point(along, outward):
+            return (float(sx + dx * along + ox * outward), float(sy + dy * along + oy * outward))
+
+        return point
+
 
     @staticmethod
     def _check_tooth_count(begin_style, end_style, tooth_count):
@@ -808,6 +1147,9 @@ class Edge(PlanarObject):
         Calculate a matching number of teeth for the edge, given its length,
         configured tooth length bounds and whether there should be an even or
         odd amount of teeth.
+
+        Used for single toothed elements, `_solve_tooth_counts` calculates the
+        same for many elements at once.
         """
         # TODO add preferred tooth length
 
@@ -858,6 +1200,49 @@ class Edge(PlanarObject):
 
         return tooth_count
 
+    @staticmethod
+    def _solve_tooth_counts(config, lengths, odd_tooth_counts):
+        """
+        Vectorized version of `_get_tooth_count`, calculating tooth counts for
+        several toothed segments at once.
+
+        Takes sequences of segment lengths and odd tooth count flags, returns a
+        list of tooth counts.
+        """
+        # TODO add preferred tooth length
+
+        if not len(lengths):
+            return []
+
+        lengths = np.asarray(lengths, dtype=float)
+        odd = np.asarray(odd_tooth_counts, dtype=bool)
+
+        min_tooth_count = np.ceil(lengths / config.tooth_max_width).astype(int)
+        max_tooth_count = np.floor(lengths / config.tooth_min_width).astype(int)
+
+        def parity_wrong(c):
+            return (c % 2 == 1) != odd
+
+        # check for satisfiability of tooth length restrictions, including
+        # parity if there is only one possible tooth count
+        unsatisfiable = min_tooth_count > max_tooth_count
+        wrong_single_count = (min_tooth_count == max_tooth_count) & parity_wrong(min_tooth_count)
+
+        if config.abort_on_tooth_length_error and (unsatisfiable | wrong_single_count).any():
+            raise ValueError('Tooth length out of range.')
+
+        # now take the middle
+        c = np.ceil((min_tooth_count + max_tooth_count) / 2).astype(int)
+        #TODO does this always work?
+        tooth_counts = np.where(parity_wrong(c), c - 1, c)
+
+        # use min_tooth_count because max_tooth_count could be zero, add one
+        # for wrong parity because min_tooth_count could be equal to one
+        fallback = min_tooth_count + parity_wrong(min_tooth_count)
+        tooth_counts = np.where(unsatisfiable | wrong_single_count, fallback, tooth_counts)
+
+        return tooth_counts.tolist()
+
 
     def get_reference(self, pos=0, length=None, projection_dir=None):
         if length is not None:
@@ -878,9 +1263,8 @@ class CutoutEdge(Edge):
     def __init__(self, length, outward_dir, begin_style=EDGE_STYLE.FLAT, end_style=EDGE_STYLE.FLAT, style=EDGE_ELEMENT_STYLE.TOOTHED, layer=Layer('cutout')):
         super(CutoutEdge, self).__init__(length, outward_dir, begin_style, end_style, style, layer)
 
-    def _render_element(self, start, direction, outward_dir, displace, wall_thickness, config, element):
+    def _render_element(self, builder, start, direction, outward_dir, displace, wall_thickness, config, element):
 
-        start = start + element.pos * direction
         length = element.length
         style = element.style
         begin_style, end_style = element.begin_style, element.end_style
@@ -891,37 +1275,33 @@ class CutoutEdge(Edge):
             assert begin_style in _EdgeElement.allowed_end_styles[EDGE_ELEMENT_STYLE.FLAT]
             assert end_style   in _EdgeElement.allowed_end_styles[EDGE_ELEMENT_STYLE.FLAT]
 
+            point = self._element_point_function(start, direction, outward_dir, element)
+
             start_pos = 0
             end_pos = length
 
-            lines = []
+            inner_begin = point(start_pos - displace, -displace)
+            inner_end   = point(end_pos + displace, -displace)
+            outer_end   = point(end_pos + displace, wall_thickness + displace)
+            outer_begin = point(start_pos - displace, wall_thickness + displace)
 
-            lines.append(Line(
-                        start + direction * (start_pos - displace) - outward_dir * displace,
-                        start + direction * (end_pos + displace) - outward_dir * displace
-                ))
+            path = [inner_begin, inner_end]
 
             if end_style == EDGE_STYLE.INTERNAL_FLAT:
-                lines.append(Line(
-                        start + direction * (end_pos + displace) - outward_dir * displace,
-                        start + direction * (end_pos + displace) + outward_dir * (wall_thickness + displace)
-                    ))
+                path.append(outer_end)
+            else:
+                builder.add_path(path, layer)
+                path = [outer_end]
 
-            lines.append(Line(
-                        start + direction * (end_pos + displace) + outward_dir * (wall_thickness + displace),
-                        start + direction * (start_pos - displace) + outward_dir * (wall_thickness + displace)
-                ))
+            path.append(outer_begin)
 
             if begin_style == EDGE_STYLE.INTERNAL_FLAT:
-                lines.append(Line(
-                        start + direction * (start_pos - displace) + outward_dir * (wall_thickness + displace),
-                        start + direction * (start_pos - displace) - outward_dir * displace
-                    ))
+                path.append(inner_begin)
 
-            return Object2D(lines, layer)
+            builder.add_path(path, layer)
 
         elif style == EDGE_ELEMENT_STYLE.FLAT_EXTENDED:
-            return Object2D()
+            pass
 
         else:
             raise Exception("Invalid _EdgeElement for rendering.")
@@ -950,6 +1330,9 @@ class EdgeReference():
         self.length = length
         self.projection_dir = projection_dir
 
+        # the reference chain collapsed, see `dereference`
+        self._edge = target.dereference()
+
         # not sure if this is needed in an EdgeReference
         if target.counterpart is not None:
             # not sure about projection_dir
@@ -958,16 +1341,41 @@ class EdgeReference():
             self.counterpart = None
 
     def add_element(self, pos, length, style, begin_style=None, end_style=None, prev_style=None, next_style=None, auto_add_counterpart=True):
-        if isinstance(pos, collections.Iterable) and len(pos) == 2 and self.projection_dir is not None:
+        if isinstance(pos, collections.abc.Iterable) and len(pos) == 2 and self.projection_dir is not None:
             pos = self.to_local_coords(pos)
         if isinstance(pos, Frac):
             pos = pos.total_length(self.length)
-        if isinstance(length, collections.Iterable) and len(length) == 2 and self.projection_dir is not None:
+        if isinstance(length, collections.abc.Iterable) and len(length) == 2 and self.projection_dir is not None:
             length = self.to_local_coords(length)
         if isinstance(length, Frac):
             length = length.total_length(self.length)
 
-        self.target.add_element(self.position + pos, length, style, begin_style, end_style, prev_style, next_style, auto_add_counterpart)
+        target, pos = self._resolve_position(pos)
+        target.add_element(pos, length, style, begin_style, end_style, prev_style, next_style, auto_add_counterpart)
+
+    def get_elements(self, pos=0, length=None):
+        if length is None:
+            length = self.length - pos
+        assert pos + length <= self.length
+
+        target, pos = self._resolve_position(pos)
+        return target.get_elements(pos, length)
+
+    def _resolve_position(self, pos):
+        """
+        Convert a position on this reference to a position on the referenced
+        edge, with the same arithmetic as going through the references one by
+        one. Returns the edge and the position.
+        """
+
+        pos = self.position + pos
+        target = self.target
+
+        while isinstance(target, EdgeReference):
+            pos = target.position + pos
+            target = target.target
+
+        return target, pos
 
     def set_style(self, style, set_counterpart=True):
         if not self.is_full_reference():
@@ -979,7 +1387,7 @@ class EdgeReference():
         if not self.is_full_reference():
             raise Exception('Getting corner edge style not supported for partial edge references.')
 
-        if isinstance(direction, collections.Iterable) and len(direction) == 2 and self.projection_dir is not None:
+        if isinstance(direction, collections.abc.Iterable) and len(direction) == 2 and self.projection_dir is not None:
             direction = self.to_local_coords(direction)
 
         return self.target.get_corner_style_by_direction(direction)
@@ -988,7 +1396,7 @@ class EdgeReference():
         if not self.is_full_reference():
             raise Exception('Setting corner edge style not supported for partial edge references.')
 
-        if isinstance(direction, collections.Iterable) and len(direction) == 2 and self.projection_dir is not None:
+        if isinstance(direction, collections.abc.Iterable) and len(direction) == 2 and self.projection_dir is not None:
             direction = self.to_local_coords(direction)
 
         self.target.set_corner_style(style, direction, set_counterpart)
@@ -1009,7 +1417,7 @@ class EdgeReference():
         if not self.is_full_reference():
             raise Exception('Getting corner counterpart not supported for partial edge references.')
 
-        if isinstance(direction, collections.Iterable) and len(direction) == 2 and self.projection_dir is not None:
+        if isinstance(direction, collections.abc.Iterable) and len(direction) == 2 and self.projection_dir is not None:
             direction = self.to_local_coords(direction)
 
         return self.target.get_corner_counterpart_by_direction(direction)
@@ -1018,7 +1426,7 @@ class EdgeReference():
         if not self.is_full_reference():
             raise Exception('Setting corner counterpart not supported for partial edge references.')
 
-        if isinstance(direction, collections.Iterable) and len(direction) == 2 and self.projection_dir is not None:
+        if isinstance(direction, collections.abc.Iterable) and len(direction) == 2 and self.projection_dir is not None:
             direction = self.to_local_coords(direction)
 
         self.target.set_corner_counterpart(counterpart, direction, backreference)
@@ -1036,4 +1444,4 @@ class EdgeReference():
         return EdgeReference(self, pos, length, projection_dir)
 
     def dereference(self):
-        return self.target.dereference()
+        return self._edge
@@ -1,10 +1,14 @@
+import itertools
+import math
 import numpy as np
 import os
 
+from . import diagnostics
+from .diagnostics import DIAGNOSTIC
 from .layer import Layer
-from .planar import CutoutRect
-from .primitive import Line, Circle, ArcPath, Text
-from .util import DIR, min_vec, max_vec, almost_equal, update_file
+from .primitive import Line, Polyline, Polygon, Circle, ArcPath, Text
+from .util import DIR, min_vec, max_vec, almost_equal_2d, update_file
+from .wall import Wall
 
 def place_2d_objects(objects, config):
     """
@@ -29,6 +33,7 @@ def export_svg(objects, config, render_bounds=None, layers=None):
         raise ValueError('No objects provided for export.')
 
     if render_bounds:
+        from .planar import CutoutRect
         objects.append(CutoutRect(render_bounds, layer=Layer('info')).render(config))
 
     vmin, vmax = objects[0].bounding_box()
@@ -63,6 +68,12 @@ def export_svg(objects, config, render_bounds=None, layers=None):
                             y2    = -p.end[1],
                             color = color,
                         )
+                elif isinstance(p, Polyline):
+                    s += '<{tag} points="{points}" stroke="{color}" stroke-width="1px" fill="none"/>\n'.format(
+                            tag    = 'polygon' if isinstance(p, Polygon) else 'polyline',
+                            points = ' '.join('{},{}'.format(x, -y) for x, y in p.points),
+                            color  = color,
+                        )
                 elif isinstance(p, Circle):
                     s += '<circle cx="{cx}" cy="{cy}" r="{r}" stroke="{color}" stroke-width="1px" fill="none"/>\n'.format(
                             cx    = p.center[0],
@@ -141,7 +152,7 @@ class PathAccumulator():
                     color = config.get_color_from_layer(self.layer)
                 )
 
-        elif isinstance(first_object, Line) or isinstance(first_object, ArcPath):
+        elif isinstance(first_object, (Line, Polyline, ArcPath)):
             self.start_point = first_object.start
             self.current_point = self.start_point
             self.output = '<path d="M {},{} '.format(
@@ -195,22 +206,38 @@ class PathAccumulator():
         if isinstance(obj, Circle) or isinstance(obj, Text):
             return False
 
-        if not (isinstance(obj, Line) or isinstance(obj, ArcPath)):
+        # polygons are closed paths on their own
+        if isinstance(obj, Polygon) and self.objects:
+            return False
+
+        if not isinstance(obj, (Line, Polyline, ArcPath)):
             raise ValueError('Unknown primitive')
 
         if not self.layer_compatible(obj.layer):
             return False
 
-        if not almost_equal(obj.start, self.current_point):
+        if not almost_equal_2d(obj.start, self.current_point):
             return False
 
 
         self.objects.append(obj)
         self.layer = self.layer.combine(obj.layer)
 
-        if isinstance(obj, Line):
+        if isinstance(obj, Polyline):
+
+            # only the end point may close the path, for polygons that's the
+            # first point again
+            inner = obj.points[1:] if isinstance(obj, Polygon) else obj.points[1:-1]
+
+            for p in inner:
+                self.output += 'L {},{} '.format(
+                        p[0],
+                        -p[1]
+                    )
+
+        if isinstance(obj, (Line, Polyline)):
 
-            if almost_equal(obj.end, self.start_point):
+            if almost_equal_2d(obj.end, self.start_point):
                 # close the path
                 self.output += 'Z" stroke="{color}" stroke-width="1px" fill="none"/>\n'.format(
                         color = self.config.get_color_from_layer(self.layer)
@@ -237,7 +264,7 @@ class PathAccumulator():
                     to_y      = -obj.end[1]
                 )
 
-            if almost_equal(obj.end, self.start_point):
+            if almost_equal_2d(obj.end, self.start_point):
                 # close the path
                 self.output += 'Z" stroke="{color}" stroke-width="1px" fill="none"/>\n'.format(
                         color = self.config.get_color_from_layer(self.layer)
@@ -256,7 +283,7 @@ class PathAccumulator():
             if self.config.warn_for_unclosed_paths:
                 m = 'WARNING: Unclosed path, rendering into warn layer.'
                 self.layer = self.layer.combine(Layer.warn(m))
-                print(m)
+                diagnostics.report(self.config, 'warn', DIAGNOSTIC.UNCLOSED_PATH, m, None, self.start_point, (self.current_point,))
 
             self.output += '" stroke="{color}" stroke-width="1px" fill="none"/>\n'.format(
                     color = self.config.get_color_from_layer(self.layer)
@@ -278,36 +305,114 @@ class PathAccumulator():
             return self.layer.compatible(other_layer)
 
 
+class _EndpointIndex():
+    """
+    Internal. Spatial hash of open paths' endpoints, used to find paths to
+    join with in constant time instead of scanning all paths.
+
+    Points are snapped to a grid of cells twice the size of the matching
+    tolerance, so any point within tolerance of a query point lies in the
+    query point's cell or one of its eight neighbours. Candidates still need
+    an exact `almost_equal_2d` check.
+    """
+
+    def __init__(self, epsilon=1E-10):
+        self.cell_size = 2 * epsilon
+        self.cells = {}
+        self.entries = {}
+
+    def _cell(self, point):
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+
+    def add(self, key, points):
+        """
+        Register the given endpoints under `key`.
+        """
+
+        cells = set(self._cell(p) for p in points)
+        self.entries[key] = cells
+
+        for c in cells:
+            self.cells.setdefault(c, set()).add(key)
+
+    def remove(self, key):
+        """
+        Remove all endpoints registered under `key`, if any.
+        """
+
+        for c in self.entries.pop(key, ()):
+            keys = self.cells[c]
+            keys.discard(key)
+            if not keys:
+                del self.cells[c]
+
+    def query(self, point):
+        """
+        Return the keys of all entries possibly having an endpoint within
+        tolerance of the given point, in ascending order.
+        """
+
+        x, y = self._cell(point)
+        keys = set()
+
+        for i in (x - 1, x, x + 1):
+            for j in (y - 1, y, y + 1):
+                c = self.cells.get((i, j))
+                if c:
+                    keys.update(c)
+
+        return sorted(keys)
+
+
 def accumulate_paths(obj, config, strict_layer_matching=True, join_nonconsecutive_paths=True):
     """
     Accumulate an Object2D's primitives into PathAccumulator objects.
+
+    Open paths are looked up by their endpoints in an `_EndpointIndex`, so
+    joining paths takes linear time in the number of primitives.
     """
 
+    # accumulators keyed by an increasing slot number; replacing an
+    # accumulator keeps its slot, so the dict order is the output order
+    accs = {}
+    endpoints = _EndpointIndex()
+    slots = itertools.count()
 
-    def join_into_list(acc, lst):
+    def store(slot, acc):
+        accs[slot] = acc
+        endpoints.remove(slot)
+        if not acc.finalized:
+            endpoints.add(slot, [acc.start_point, acc.current_point])
 
-        if acc.finalized or not join_nonconsecutive_paths:
-            lst.append(acc)
-            return
+    def discard(slot):
+        del accs[slot]
+        endpoints.remove(slot)
 
-        start_matching = []
-        end_matching = []
+    def find_matching(acc, point, forward_attr, backward_attr):
 
-        for index, elem in enumerate(lst):
+        matching = []
 
-            if not elem.finalized and elem.layer_compatible(acc.layer):
+        for slot in endpoints.query(point):
+            elem = accs[slot]
 
-                if almost_equal(acc.start_point, elem.current_point):
-                    start_matching.append( (index, elem, True) )
+            if elem.layer_compatible(acc.layer):
 
-                elif almost_equal(acc.start_point, elem.start_point):
-                    start_matching.append( (index, elem, False) )
+                if almost_equal_2d(point, getattr(elem, forward_attr)):
+                    matching.append( (slot, elem, True) )
 
-                if almost_equal(acc.current_point, elem.start_point):
-                    end_matching.append( (index, elem, True) )
+                elif almost_equal_2d(point, getattr(elem, backward_attr)):
+                    matching.append( (slot, elem, False) )
 
-                elif almost_equal(acc.current_point, elem.current_point):
-                    end_matching.append( (index, elem, False) )
+        return matching
+
+    def join_into_list(acc):
+
+        if acc.finalized or not join_nonconsecutive_paths:
+            store(next(slots), acc)
+            return
+
+        start_matching = find_matching(acc, acc.start_point, 'current_point', 'start_point')
+        end_matching = find_matching(acc, acc.current_point, 'start_point', 'current_point')
 
         assert len(start_matching) in [0, 1]
         assert len(end_matching) in [0, 1]
@@ -323,56 +428,61 @@ def accumulate_paths(obj, config, strict_layer_matching=True, join_nonconsecutiv
                     s_elem.add_object_list(acc.objects)
                 else:
                     s_elem.add_object_list([o.reverse() for o in reversed(acc.objects)])
+                store(s_index, s_elem)
 
             elif s_dir_matching and e_dir_matching:
                 s_elem.add_object_list(acc.objects + e_elem.objects)
-                lst.pop(e_index)
+                store(s_index, s_elem)
+                discard(e_index)
             elif s_dir_matching:
                 s_elem.add_object_list(
                         acc.objects + [o.reverse() for o in reversed(e_elem.objects)]
                     )
-                lst.pop(e_index)
+                store(s_index, s_elem)
+                discard(e_index)
             elif e_dir_matching:
-                lst[s_index] = PathAccumulator.from_list(
+                store(s_index, PathAccumulator.from_list(
                         [o.reverse() for o in reversed(s_elem.objects)] + acc.objects + e_elem.objects,
                         config,
                         strict_layer_matching
-                    )
-                lst.pop(e_index)
+                    ))
+                discard(e_index)
             else:
                 e_elem.add_object_list(
                         [o.reverse() for o in reversed(acc.objects)] + s_elem.objects
                     )
-                lst.pop(s_index)
+                store(e_index, e_elem)
+                discard(s_index)
 
         elif start_matching:
             index, elem, dir_matching = start_matching[0]
 
             if dir_matching:
                 elem.add_object_list(acc.objects)
+                store(index, elem)
             else:
-                lst[index] = PathAccumulator.from_list(
+                store(index, PathAccumulator.from_list(
                         [o.reverse() for o in reversed(acc.objects)] + elem.objects,
                         config,
                         strict_layer_matching
-                    )
+                    ))
 
         elif end_matching:
             index, elem, dir_matching = end_matching[0]
 
             if dir_matching:
                 acc.add_object_list(elem.objects)
-                lst[index] = acc
+                store(index, acc)
             else:
                 elem.add_object_list(
                         [o.reverse() for o in reversed(acc.objects)]
                     )
+                store(index, elem)
 
         else:
-            lst.append(acc)
+            store(next(slots), acc)
 
 
-    acc_list = []
     acc = None
 
     for p in obj.primitives:
@@ -384,13 +494,13 @@ def accumulate_paths(obj, config, strict_layer_matching=True, join_nonconsecutiv
             r = acc.add_object(p)
 
             if not r:
-                join_into_list(acc, acc_list)
+                join_into_list(acc)
 
                 acc = PathAccumulator(p, config, strict_layer_matching)
 
-    join_into_list(acc, acc_list)
+    join_into_list(acc)
 
-    return acc_list
+    return list(accs.values())
 
 
 def export_svg_with_paths(objects, config, render_bounds=None, layers=None, join_nonconsecutive_paths=True):
@@ -405,6 +515,7 @@ def export_svg_with_paths(objects, config, render_bounds=None, layers=None, join
         raise ValueError('No objects provided for export.')
 
     if render_bounds:
+        from .planar import CutoutRect
         objects.append(CutoutRect(render_bounds, layer=Layer('info')).render(config))
 
     vmin, vmax = objects[0].bounding_box()
@@ -653,7 +764,7 @@ def export_object_openscad(obj, config, directory, filename='export', layers=Non
     update_file(os.path.join(directory, '{}.scad'.format(filename)), openscad_source)
 
 
-def export_box_openscad(box, config, directory, main_filename='export', layers=None, join_all_svg=True, single_scad_file=False, single_wall_rules=False):
+def export_box_openscad(box, config, directory, main_filename='export', layers=None, join_all_svg=True, single_scad_file=False, single_wall_rules=False, workers=None):
     """
     Export given box to OpenSCAD for previewing.
 
@@ -677,42 +788,45 @@ def export_box_openscad(box, config, directory, main_filename='export', layers=N
     If `single_wall_rules` is `True` make rules and scad files are added to
     make export or view single walls. The added rules are of the form `view-w*`
     and `w*.stl`, where the asterisk is replaced by the wall's index.
-    """
 
-    walls = box._gather_walls(config)
-
-    # uniquify wall references, keep order for deterministic output
-    seen = set()
-    walls = [(w,p,d) for w,p,d in box._gather_walls(config) if not (w in seen or seen.add(w))]
-
-    global_openscad_source = ''
-    global_prereqs = []
-    extra_make = ''
+    If `workers` is given, walls are rendered and their SVG files written in
+    a pool of that many forked processes.
+    """
 
-    for wall_index, (wall, pos, direction) in enumerate(walls):
+    walls = box._get_registry(config).get_placements(box)
 
-        # export single wall
+    box._prepare_edges([w for w,_,_ in walls], config)
 
-        rendered = wall.render(config)
-        wall_name = 'w{}'.format(wall_index)
+    # export single walls
 
-        wall_source, svg_filenames = _export_object_to_openscad(
+    def export_wall(wall_index, rendered):
+        return _export_object_to_openscad(
                 rendered,
-                wall_name,
+                'w{}'.format(wall_index),
                 directory,
                 layers,
                 config,
                 join_all_svg
             )
 
+    exported_walls = Wall._render_walls([w for w,_,_ in walls], config, workers, export_wall)
+
+    global_openscad_source = ''
+    global_prereqs = []
+    extra_make = ''
+
+    for wall_index, (wall, pos, direction) in enumerate(walls):
+
+        wall_source, svg_filenames = exported_walls[wall_index]
+        wall_name = 'w{}'.format(wall_index)
+
         # add absolute position of wall object to openscad source
 
-        if (abs(direction) == DIR.RIGHT).all():
-            rotate = 'rotate([90,0,90])'
-        elif (abs(direction) == DIR.UP).all():
-            rotate = 'rotate([90,0,0])'
-        elif (abs(direction) == DIR.FRONT).all():
-            rotate = 'rotate([0,0,0])'
+        rotate = {
+                'X' : 'rotate([90,0,90])',
+                'Y' : 'rotate([90,0,0])',
+                'Z' : 'rotate([0,0,0])',
+            }[DIR.dir_to_axis_name(direction)]
 
         openscad_source = """
             translate([{apx}, {apy}, {apz}])
@@ -1,17 +1,48 @@
+import functools
+import weakref
+
+
 class Layer():
     """
     Stores layer information including main layer, warning level and warning
     data.
+
+    Layer objects are interned flyweights: constructing a layer with the same
+    name, warning level and warnings returns the already existing object.
+    Layers are therefore immutable and the warnings are stored as a tuple
+    shared by all users of the layer. Layers no longer in use are freed.
     """
 
-    def __init__(self, name, warn_level=None, warnings=None):
+    __slots__ = ('name', 'warn_level', 'warnings', '_key', '__weakref__')
+
+    _registry = weakref.WeakValueDictionary()
+
+    def __new__(cls, name, warn_level=None, warnings=None):
+
+        warnings = tuple(warnings) if warnings is not None else ()
+        key = (name, warn_level, warnings)
+
+        layer = cls._registry.get(key)
+
+        if layer is None:
+            layer = object.__new__(cls)
+            object.__setattr__(layer, 'name', name)
+            object.__setattr__(layer, 'warn_level', warn_level)
+            object.__setattr__(layer, 'warnings', warnings)
+            object.__setattr__(layer, '_key', key)
+            cls._registry[key] = layer
+
+        return layer
 
-        if warnings is None:
-            warnings = []
+    def __setattr__(self, name, value):
+        raise AttributeError('Layers are immutable.')
 
-        self.name = name
-        self.warn_level = warn_level
-        self.warnings = warnings
+    def __delattr__(self, name):
+        raise AttributeError('Layers are immutable.')
+
+    def __reduce__(self):
+        # re-intern when unpickling or copying
+        return (Layer, (self.name, self.warn_level, self.warnings))
 
     @staticmethod
     def warn(warning):
@@ -34,18 +65,30 @@ class Layer():
         Combine data with the given layer's, merging warning level information.
 
         Raises an exception if the main layer does not match.
+
+        Results are cached per pair of layer values.
         """
 
-        name = self.name
-        warnings = self.warnings + other.warnings
-        warn_level = self.warn_level
+        return Layer._combine(self._key, other._key)
 
-        if other.name is not None:
-            assert(self.name is None or self.name == other.name)
-            name = other.name
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _combine(key, other_key):
+        """
+        Internal implementation of `combine`, working on the layers' keys.
+        """
 
-        if self.warn_level is None or (self.warn_level == 'warn' and other.warn_level == 'error'):
-            warn_level = other.warn_level
+        name, warn_level, warnings = key
+        other_name, other_warn_level, other_warnings = other_key
+
+        warnings = warnings + other_warnings
+
+        if other_name is not None:
+            assert(name is None or name == other_name)
+            name = other_name
+
+        if warn_level is None or (warn_level == 'warn' and other_warn_level == 'error'):
+            warn_level = other_warn_level
 
         return Layer(name, warn_level, warnings)
 
@@ -61,4 +104,7 @@ class Layer():
         Check whether main layer data and warning level matches the given layer's.
         """
 
-        return self.name == other.name and self.warn_level == other.warn_level
+        return self is other or (self.name == other.name and self.warn_level == other.warn_level)
+
+    def __hash__(self):
+        return hash((self.name, self.warn_level))
@@ -3,7 +3,7 @@ import math
 
 from .layer import Layer
 from .util import DIR2
-from .primitive import Object2D, PlanarObject, Line, Circle, ArcPath
+from .primitive import Object2D, PlanarObject, Line, Polygon, Circle, ArcPath
 from .edge import EDGE_STYLE, EDGE_ELEMENT_STYLE
 
 
@@ -233,10 +233,12 @@ class AirVentsCutout(PlanarObject):
         for x1, x2 in x_positions:
             for y1, y2 in y_positions:
 
-                l.append(Line(np.array([x1 + displace, y1 + displace]), np.array([x2 - displace, y1 + displace])))
-                l.append(Line(np.array([x2 - displace, y1 + displace]), np.array([x2 - displace, y2 - displace])))
-                l.append(Line(np.array([x2 - displace, y2 - displace]), np.array([x1 + displace, y2 - displace])))
-                l.append(Line(np.array([x1 + displace, y2 - displace]), np.array([x1 + displace, y1 + displace])))
+                l.append(Polygon([
+                        [x1 + displace, y1 + displace],
+                        [x2 - displace, y1 + displace],
+                        [x2 - displace, y2 - displace],
+                        [x1 + displace, y2 - displace],
+                    ]))
 
         return Object2D(l, self.layer) - (self.center_dir * self.size / 2)
 
@@ -1,42 +1,325 @@
 import numpy as np
 import math
-import svgpathtools
 
 from .layer import Layer
-from .util import DIR2, min_vec, max_vec, mirror_array_bool_to_factor
+from .util import DIR2, min_vec, max_vec, mirror_array_bool_to_factor, arc_bounding_boxes, almost_equal_2d
 from .units import Frac
 
 
 class Object2D():
     """
     Helper class to group several 2D primitives toghether into a 2D object.
+
+    Primitives are not stored as individual objects, but column-wise in numpy
+    arrays, one row per primitive. Lines and arcs use the `start` and `end`
+    columns, circles and texts store their center/position in both. The
+    `radius` column holds circle and arc radii and text font sizes. Layers and
+    text strings are stored once per object and referenced by index, texts
+    together with their original font size, which is returned unless the
+    object has been scaled, so integer font sizes stay integers.
+
+    Polyline and polygon vertices are stored in a separate `vertices` array,
+    each row referencing its vertices by offset and count. Polygons store
+    their first vertex again at the end, so reversing the vertex array keeps
+    their start point. The `start` and `end` columns hold their first and last
+    vertex.
+
+    This way transformations and bounding box calculations run as a single
+    vectorized operation on all primitives. Individual primitive objects are
+    still available through the `primitives` attribute or by iterating over
+    the object.
+
+    The column arrays are never modified in place, so they can be shared
+    between objects.
+
+    Transformations are not applied right away. Instead each Object2D carries
+    a pending affine transformation matrix (plus radius scale and a reversal
+    flag) which is composed with further transformations and only applied to
+    the columns when the geometry is actually needed, ie. when iterating over
+    primitives, calculating the bounding box or concatenating objects.
+
+    The bounding box is cached once calculated. Concatenated objects and
+    copies transformed by axis aligned transformations (translation,
+    mirroring, scaling, rotation by multiples of 90 degrees) derive their
+    bounding box from the cached ones without looking at the primitives.
     """
 
+    _KIND_LINE = 0
+    _KIND_CIRCLE = 1
+    _KIND_ARC = 2
+    _KIND_TEXT = 3
+    _KIND_POLYLINE = 4
+    _KIND_POLYGON = 5
+
+    _FLAG_LARGE_ARC = 1
+    _FLAG_SWEEP = 2
+
     def __init__(self, primitives=None, layer=None):
 
-        if primitives is None:
-            self.primitives = []
-        else:
-            self.primitives = primitives
+        builder = Object2DBuilder()
+
+        for p in (primitives if primitives is not None else []):
+            builder.append(p)
+
+        builder._store(self)
 
         if layer is not None:
             self.set_layer(layer)
 
+    def _copy(self):
+        """
+        Internal. Create a new Object2D sharing this object's columns and
+        pending transformation.
+        """
+
+        o = Object2D.__new__(Object2D)
+        o.__dict__.update(self.__dict__)
+        o._layers = list(self._layers)
+
+        return o
+
+    def _with_transform(self, matrix, radius_scale=1, reverse=False):
+        """
+        Internal. Create a new Object2D sharing this object's columns, with the
+        given transformation composed onto the pending one.
+
+        `matrix` is a 3x3 affine transformation matrix operating on column
+        vectors in homogeneous coordinates.
+        """
+
+        o = self._copy()
+
+        o._transform = matrix if self._transform is None else matrix.dot(self._transform)
+        o._radius_scale = self._radius_scale * radius_scale
+        o._reversed = self._reversed != reverse
+
+        o._bbox = self._transform_bounding_box(self._bbox, matrix)
+
+        return o
+
+    @staticmethod
+    def _transform_bounding_box(bbox, matrix):
+        """
+        Internal. Transform a cached bounding box by the given affine matrix.
+
+        Returns None if there is no cached bounding box, or if the matrix does
+        not map axis aligned boxes to axis aligned boxes (eg. rotations by
+        arbitrary angles).
+        """
+
+        if bbox is None:
+            return None
+
+        linear = matrix[:2,:2]
+
+        if not ((linear[0,1] == 0 and linear[1,0] == 0) or (linear[0,0] == 0 and linear[1,1] == 0)):
+            return None
+
+        a = linear.dot(bbox[0]) + matrix[:2,2]
+        b = linear.dot(bbox[1]) + matrix[:2,2]
+
+        return (np.minimum(a, b), np.maximum(a, b))
+
+    def _apply_transform(self):
+        """
+        Internal. Apply the pending transformation to the stored columns.
+
+        The columns are replaced, not modified, so other objects sharing them
+        are not affected.
+        """
+
+        if self._transform is not None:
+
+            linear = self._transform[:2,:2]
+            translation = self._transform[:2,2]
+
+            if (linear == np.identity(2)).all():
+                self._start = self._start + translation
+                self._end = self._end + translation
+                self._vertices = self._vertices + translation
+
+            else:
+                self._start = self._start.dot(linear.T) + translation
+                self._end = self._end.dot(linear.T) + translation
+                self._vertices = self._vertices.dot(linear.T) + translation
+
+                # mirroring changes the arc direction
+                if np.linalg.det(linear) < 0:
+                    self._flags = np.where(self._kind == self._KIND_ARC, self._flags ^ self._FLAG_SWEEP, self._flags).astype(np.uint8)
+
+        if self._radius_scale != 1:
+            self._radius = self._radius * self._radius_scale
+
+        if self._reversed:
+
+            # circles and texts have identical start and end points, so
+            # swapping them is a no-op
+            self._start, self._end = self._end[::-1], self._start[::-1]
+            self._flags = np.where(self._kind == self._KIND_ARC, self._flags ^ self._FLAG_SWEEP, self._flags).astype(np.uint8)[::-1]
+
+            for name in ['_kind', '_radius', '_layer_id', '_text_id']:
+                setattr(self, name, getattr(self, name)[::-1])
+
+            # reversing the whole vertex array reverses each polyline's
+            # vertices and the polylines' order
+            n = len(self._vertices)
+            self._vertices = self._vertices[::-1]
+            self._vertex_offset = np.where(self._vertex_count > 0, n - self._vertex_offset - self._vertex_count, 0)[::-1]
+            self._vertex_count = self._vertex_count[::-1]
+
+        self._transform = None
+        self._radius_scale = 1
+        self._reversed = False
+
+    @staticmethod
+    def _concatenate(objects):
+        """
+        Internal. Concatenate the primitives of all given Object2Ds into a new
+        one, in a single pass over their columns.
+        """
+
+        if not objects:
+            return Object2D()
+
+        for obj in objects:
+            obj._apply_transform()
+
+        o = Object2D.__new__(Object2D)
+        o._layers = []
+        o._texts = []
+        o._transform = None
+        o._radius_scale = 1
+        o._reversed = False
+        o._bbox = None
+
+        layer_indices = {}
+        layer_ids = []
+        text_ids = []
+        vertex_offsets = []
+        vertex_count = 0
+
+        for obj in objects:
+
+            # merge layer lists, keeping each distinct layer object once
+            mapping = []
+            for l in obj._layers:
+                if id(l) not in layer_indices:
+                    layer_indices[id(l)] = len(o._layers)
+                    o._layers.append(l)
+                mapping.append(layer_indices[id(l)])
+
+            # the index shifts are skipped where they don't change anything
+            if mapping == list(range(len(mapping))):
+                layer_ids.append(obj._layer_id)
+            else:
+                layer_ids.append(np.array(mapping, dtype=np.int32)[obj._layer_id])
+
+            if obj._texts and o._texts:
+                text_ids.append(np.where(obj._text_id >= 0, obj._text_id + len(o._texts), -1))
+            else:
+                text_ids.append(obj._text_id)
+            o._texts.extend(obj._texts)
+
+            if vertex_count and len(obj._vertices):
+                vertex_offsets.append(np.where(obj._vertex_count > 0, obj._vertex_offset + vertex_count, 0))
+            else:
+                vertex_offsets.append(obj._vertex_offset)
+            vertex_count += len(obj._vertices)
+
+        o._kind     = np.concatenate([obj._kind     for obj in objects])
+        o._start    = np.concatenate([obj._start    for obj in objects])
+        o._end      = np.concatenate([obj._end      for obj in objects])
+        o._radius   = np.concatenate([obj._radius   for obj in objects])
+        o._flags    = np.concatenate([obj._flags    for obj in objects])
+        o._layer_id = np.concatenate(layer_ids).astype(np.int32)
+        o._text_id  = np.concatenate(text_ids).astype(np.int32)
+
+        o._vertices      = np.concatenate([obj._vertices for obj in objects])
+        o._vertex_offset = np.concatenate(vertex_offsets).astype(np.int64)
+        o._vertex_count  = np.concatenate([obj._vertex_count for obj in objects])
+
+        # derive the bounding box if all non-empty parts have a cached one
+        boxes = [obj._bbox for obj in objects if len(obj)]
+        if boxes and all(bb is not None for bb in boxes):
+            o._bbox = (
+                    np.min([bb[0] for bb in boxes], axis=0),
+                    np.max([bb[1] for bb in boxes], axis=0),
+                )
+
+        return o
+
+    def _get_primitive(self, i):
+        """
+        Internal. Construct the primitive object corresponding to row `i`.
+
+        The pending transformation must already be applied.
+        """
+
+        kind = self._kind[i]
+        layer = self._layers[self._layer_id[i]]
+
+        if kind == self._KIND_LINE:
+            return Line(self._start[i], self._end[i], layer=layer)
+
+        elif kind == self._KIND_CIRCLE:
+            return Circle(self._start[i], self._radius[i], layer=layer)
+
+        elif kind == self._KIND_POLYLINE:
+            offset, count = self._vertex_offset[i], self._vertex_count[i]
+            return Polyline(self._vertices[offset:offset+count], layer=layer)
+
+        elif kind == self._KIND_POLYGON:
+            # skip the repeated first vertex
+            offset, count = self._vertex_offset[i], self._vertex_count[i]
+            return Polygon(self._vertices[offset:offset+count-1], layer=layer)
+
+        elif kind == self._KIND_ARC:
+            return ArcPath(
+                    self._start[i],
+                    self._end[i],
+                    self._radius[i],
+                    bool(self._flags[i] & self._FLAG_LARGE_ARC),
+                    bool(self._flags[i] & self._FLAG_SWEEP),
+                    layer=layer,
+                )
+
+        else:
+            text, fontsize = self._texts[self._text_id[i]]
+            if self._radius[i] != fontsize:
+                fontsize = self._radius[i]
+            return Text(self._start[i], text, fontsize, layer=layer)
+
+    @property
+    def primitives(self):
+        """
+        A tuple of primitive objects, constructed from the stored columns.
+
+        Use `append` or `extend` to add primitives to this Object2D.
+        """
+
+        return tuple(self)
+
+    def __iter__(self):
+        self._apply_transform()
+        return (self._get_primitive(i) for i in range(len(self)))
+
+    def __len__(self):
+        return len(self._kind)
+
     def set_layer(self, layer):
         """
         Overwrite all children's layers to the given value.
         """
 
-        for p in self.primitives:
-            p.layer = layer
+        self._layers = [layer]
+        self._layer_id = np.zeros(len(self), dtype=np.int32)
 
     def update_layer(self, layer):
         """
         Update all children's layers with the given value.
         """
 
-        for p in self.primitives:
-            p.layer = p.update_layer(layer)
+        self._layers = [l.combine(layer) for l in self._layers]
 
     def bounding_box(self):
         """
@@ -45,15 +328,49 @@ class Object2D():
         Return value is `(min_corner, max_corner)`.
         """
 
-        if not self.primitives:
+        if not len(self):
             raise ValueError('Cannot calculate bounding box for empty collection.')
 
-        bounding_boxes = [p.bounding_box() for p in self.primitives]
+        if self._bbox is None:
+            self._bbox = self._calc_bounding_box()
 
-        vmin = min_vec(*(pmin for pmin, pmax in bounding_boxes))
-        vmax = max_vec(*(pmax for pmin, pmax in bounding_boxes))
+        return (self._bbox[0].copy(), self._bbox[1].copy())
 
-        return (vmin, vmax)
+    def _calc_bounding_box(self):
+        """
+        Internal. Calculate the bounding box from the primitives, ignoring
+        the cache.
+        """
+
+        self._apply_transform()
+
+        # circles extend by their radius in all directions, texts only
+        # consist of their position
+        extent = np.where(self._kind == self._KIND_CIRCLE, self._radius, 0)[:,np.newaxis]
+
+        vmin = np.minimum(self._start, self._end) - extent
+        vmax = np.maximum(self._start, self._end) + extent
+
+        polylines = self._vertex_count > 0
+
+        if polylines.any():
+            # vertices of consecutive polylines are contiguous
+            offsets = self._vertex_offset[polylines]
+            vmin[polylines] = np.minimum.reduceat(self._vertices, offsets, axis=0)
+            vmax[polylines] = np.maximum.reduceat(self._vertices, offsets, axis=0)
+
+        arcs = self._kind == self._KIND_ARC
+
+        if arcs.any():
+            vmin[arcs], vmax[arcs] = arc_bounding_boxes(
+                    self._start[arcs],
+                    self._end[arcs],
+                    self._radius[arcs],
+                    self._flags[arcs] & self._FLAG_LARGE_ARC,
+                    self._flags[arcs] & self._FLAG_SWEEP,
+                )
+
+        return (vmin.min(axis=0), vmax.max(axis=0))
 
     def __add__(self, b):
         """
@@ -61,26 +378,42 @@ class Object2D():
         primitive list. Else perform element wise additionn.
         """
         if isinstance(b, Object2D):
-            return Object2D(self.primitives + b.primitives)
-        return Object2D([i + b for i in self.primitives])
+            return Object2D._concatenate([self, b])
+        return self._with_transform(self._translation_matrix(b))
 
     def __sub__(self, b):
         """
         Perform elementwise subtraction.
         """
-        return Object2D([i - b for i in self.primitives])
+        return self._with_transform(self._translation_matrix(-np.asarray(b)))
+
+    @staticmethod
+    def _translation_matrix(v):
+        """
+        Internal. Construct an affine matrix translating by the vector `v`.
+        """
+
+        m = np.identity(3)
+        m[:2,2] = v
+        return m
 
     def append(self, b):
         """
         Append a primitive to own primitive list.
         """
-        self.primitives.append(b)
+        self.extend(Object2D([b]))
 
     def extend(self, b):
         """
         Extend own primitive list with another Object2D's one.
         """
-        self.primitives.extend(b.primitives)
+
+        # keep an existing cached bounding box up to date
+        if self._bbox is not None and len(b):
+            b.bounding_box()
+
+        o = Object2D._concatenate([self, b])
+        self.__dict__.update(o.__dict__)
 
     def rotate(self, deg):
         """
@@ -90,7 +423,13 @@ class Object2D():
 
         The rotation amount is given in degrees.
         """
-        return Object2D([p.rotate(deg) for p in self.primitives])
+
+        # use the same (exact for multiples of 90 degrees) rotation as single
+        # vectors
+        m = np.identity(3)
+        m[:2,0] = DIR2.rotate([1,0], deg)
+        m[:2,1] = DIR2.rotate([0,1], deg)
+        return self._with_transform(m)
 
     def mirror(self, mirror_axes):
         """
@@ -101,7 +440,10 @@ class Object2D():
         The axes are specified by a boolean array `mirror_axes` indicating
         which axes should be inverted.
         """
-        return Object2D([p.mirror(mirror_axes) for p in self.primitives])
+
+        m = np.identity(3)
+        m[:2,:2] = np.diag(mirror_array_bool_to_factor(mirror_axes))
+        return self._with_transform(m)
 
     def scale(self, fac):
         """
@@ -109,7 +451,9 @@ class Object2D():
         'global' (meaning local to this Object2D, not its primitives) reference
         system by the specified factor.
         """
-        return Object2D([p.scale(fac) for p in self.primitives])
+        m = np.identity(3)
+        m[:2,:2] *= fac
+        return self._with_transform(m, radius_scale=fac)
 
     def reverse(self):
         """
@@ -117,16 +461,254 @@ class Object2D():
         start and end points swapped. This is used for exporting longer svg
         path objects.
         """
-        return Object2D([p.reverse() for p in reversed(self.primitives)])
+
+        return self._with_transform(np.identity(3), reverse=True)
+
+    def merge_lines(self):
+        """
+        Return a new Object2D where each run of consecutive, connected lines
+        on the same layer is replaced by a single `Polyline`, or a `Polygon`
+        if the run ends at its start point. The order of all primitives is
+        kept.
+        """
+
+        self._apply_transform()
+
+        kinds = self._kind.tolist()
+        starts = self._start.tolist()
+        ends = self._end.tolist()
+        layer_ids = self._layer_id.tolist()
+
+        builder = Object2DBuilder()
+
+        for i in range(len(kinds)):
+            if kinds[i] == self._KIND_LINE:
+                builder.add_path((tuple(starts[i]), tuple(ends[i])), self._layers[layer_ids[i]])
+            else:
+                builder.append(self._get_primitive(i))
+
+        o = builder.build()
+        o._bbox = self._bbox
+        return o
+
+
+class Object2DBuilder():
+    """
+    Helper class to assemble an Object2D from many parts.
+
+    Repeatedly concatenating Object2Ds via `+` or `extend` copies all columns
+    each time, so building an object from n parts takes quadratic time. The
+    builder only collects the parts (amortized constant time per part) and
+    concatenates all of them once in `build`.
+
+    Single primitives and paths are collected as rows of plain Python lists,
+    which are only converted to numpy columns in `build` (or before the next
+    Object2D part), so adding many small pieces doesn't allocate arrays for
+    each of them.
+
+    Paths added by `add_path` are joined with the previous one if it ends at
+    the new path's start on the same layer. Each joined run becomes a `Line`,
+    a `Polyline`, or a `Polygon` if it ends at its start point.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._run = []
+        self._run_layer = None
+        self._reset_rows()
+
+    def _reset_rows(self):
+        """
+        Internal. Start a new set of row lists.
+        """
+
+        self._kinds = []
+        self._starts = []
+        self._ends = []
+        self._radii = []
+        self._flags = []
+        self._layer_ids = []
+        self._text_ids = []
+        self._vertices = []
+        self._vertex_offsets = []
+        self._vertex_counts = []
+
+        self._layers = []
+        self._layer_indices = {}
+        self._texts = []
+
+    def _add_row(self, kind, start, end, radius, layer, flag=0, text_id=-1, vertices=None):
+        """
+        Internal. Add a row for a single primitive. `vertices` is the vertex
+        list of polylines and polygons.
+        """
+
+        if id(layer) not in self._layer_indices:
+            self._layer_indices[id(layer)] = len(self._layers)
+            self._layers.append(layer)
+
+        if vertices is not None:
+            self._vertex_offsets.append(len(self._vertices))
+            self._vertex_counts.append(len(vertices))
+            self._vertices.extend(vertices)
+        else:
+            self._vertex_offsets.append(0)
+            self._vertex_counts.append(0)
+
+        self._kinds.append(kind)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._radii.append(radius)
+        self._flags.append(flag)
+        self._layer_ids.append(self._layer_indices[id(layer)])
+        self._text_ids.append(text_id)
+
+    def _store(self, o):
+        """
+        Internal. Convert the collected rows into the columns of the Object2D
+        `o` and start a new set of rows.
+        """
+
+        self._flush_run()
+
+        o._kind = np.array(self._kinds, dtype=np.int8)
+        o._start = np.array(self._starts, dtype=float).reshape(-1, 2)
+        o._end = np.array(self._ends, dtype=float).reshape(-1, 2)
+        o._radius = np.array(self._radii, dtype=float)
+        o._flags = np.array(self._flags, dtype=np.uint8)
+        o._layer_id = np.array(self._layer_ids, dtype=np.int32)
+        o._text_id = np.array(self._text_ids, dtype=np.int32)
+        o._vertices = np.array(self._vertices, dtype=float).reshape(-1, 2)
+        o._vertex_offset = np.array(self._vertex_offsets, dtype=np.int64)
+        o._vertex_count = np.array(self._vertex_counts, dtype=np.int64)
+
+        o._layers = self._layers
+        o._texts = self._texts
+
+        o._transform = None
+        o._radius_scale = 1
+        o._reversed = False
+
+        o._bbox = None
+
+        self._reset_rows()
+
+    def _flush_run(self):
+        """
+        Internal. Convert the current run of joined paths into a row.
+        """
+
+        run = self._run
+
+        if len(run) == 2:
+            self._add_row(Object2D._KIND_LINE, run[0], run[1], 0, self._run_layer)
+        elif len(run) > 2 and almost_equal_2d(run[0], run[-1]):
+            # polygons store their first vertex again at the end
+            vertices = run[:-1] + [run[0]]
+            self._add_row(Object2D._KIND_POLYGON, run[0], run[0], 0, self._run_layer, vertices=vertices)
+        elif len(run) > 2:
+            self._add_row(Object2D._KIND_POLYLINE, run[0], run[-1], 0, self._run_layer, vertices=list(run))
+
+        self._run = []
+
+    def _flush(self):
+        """
+        Internal. Convert pending rows into an Object2D part.
+        """
+
+        self._flush_run()
+
+        if self._kinds:
+            o = Object2D.__new__(Object2D)
+            self._store(o)
+            self._parts.append(o)
+
+    def append(self, b):
+        """
+        Append a primitive.
+        """
+
+        self._flush_run()
+
+        kind = b._kind
+
+        if kind == Object2D._KIND_LINE:
+            self._add_row(kind, b._start, b._end, 0, b.layer)
+
+        elif kind == Object2D._KIND_POLYLINE or kind == Object2D._KIND_POLYGON:
+            points = b._points + (b._points[0],) if kind == Object2D._KIND_POLYGON else b._points
+            self._add_row(kind, points[0], points[-1], 0, b.layer, vertices=points)
+
+        elif kind == Object2D._KIND_CIRCLE:
+            self._add_row(kind, b._center, b._center, b.radius, b.layer)
+
+        elif kind == Object2D._KIND_ARC:
+            flag = 0
+            if b.large_arc:
+                flag |= Object2D._FLAG_LARGE_ARC
+            if b.sweep:
+                flag |= Object2D._FLAG_SWEEP
+            self._add_row(kind, b._start, b._end, b.radius, b.layer, flag=flag)
+
+        else:
+            self._add_row(kind, b._position, b._position, b.fontsize, b.layer, text_id=len(self._texts))
+            self._texts.append((b.text, b.fontsize))
+
+    def add_path(self, points, layer):
+        """
+        Append a path through the given points, given as tuples of floats,
+        joining it with the previously added path if possible.
+        """
+
+        for start, end in zip(points, points[1:]):
+
+            run = self._run
+
+            if not (run and layer is self._run_layer and almost_equal_2d(start, run[-1])):
+                self._flush_run()
+                run = self._run
+                run.append(start)
+                self._run_layer = layer
+
+            run.append(end)
+
+            # closed runs become polygons
+            if len(run) > 3 and almost_equal_2d(run[0], run[-1]):
+                self._flush_run()
+
+    def extend(self, b):
+        """
+        Append all primitives of an Object2D.
+        """
+        self._flush()
+
+        # the copy keeps later in-place changes to `b` (`extend`, `set_layer`)
+        # out of the result
+        self._parts.append(b._copy())
+
+    def build(self):
+        """
+        Concatenate all collected parts into a new Object2D.
+        """
+        self._flush()
+
+        if len(self._parts) == 1:
+            return self._parts[0]._copy()
+
+        return Object2D._concatenate(self._parts)
 
 
 class PlanarObject():
     """
     Abstract base class for objects that render into an Object2D.
+
+    Methods changing an object's state bump its `_revision`, which is used by
+    walls and edges to invalidate cached render results.
     """
 
     _data_to_local_coords = None
     parent = None
+    _revision = 0
 
     def __init__(self, layer=Layer('cutout')):
         self.layer = layer
@@ -137,6 +719,7 @@ class PlanarObject():
         """
 
         self.layer = self.layer.combine(layer)
+        self._revision += 1
 
     def render(self, config):
         """Render into an Object2D."""
@@ -167,6 +750,7 @@ class PlanarObject():
                         v = Frac.array_total_length(v, parent.size)
                         setattr(self, e, v)
 
+        self._revision += 1
         self.init_parent()
 
     def init_parent(self):
@@ -191,11 +775,68 @@ class PlanarObject():
             return np.array(v)
 
 
-class Primitive2D(PlanarObject):
+def _point(v):
+    """
+    Convert a 2D vector (or a scalar, used for both coordinates) to a tuple of
+    floats.
+    """
+
+    if np.ndim(v) == 0:
+        return (float(v), float(v))
+    return (float(v[0]), float(v[1]))
+
+
+class Primitive2D():
     """
     Abstract base class for 2D primitives.
+
+    Primitives are immutable and hashable, so they can be used as dict keys
+    or set members. Their coordinates are stored as tuples of floats, which
+    are shared instead of copied between derived primitives where possible,
+    and returned as numpy arrays.
+
+    Like `PlanarObject`s primitives added to walls keep a reference to their
+    parent and their position in it, as `own_position` since texts already
+    use `position`. These are not part of the primitive's value.
     """
 
+    __slots__ = ('layer', 'parent', 'own_position')
+
+    # primitives never change, see `PlanarObject`
+    _revision = 0
+
+    def __init__(self, layer):
+        object.__setattr__(self, 'layer', layer)
+        object.__setattr__(self, 'parent', None)
+        object.__setattr__(self, 'own_position', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Primitives are immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('Primitives are immutable.')
+
+    def __setstate__(self, state):
+        # used by pickle and copy, slotted state is the second item
+        for name, value in state[1].items():
+            object.__setattr__(self, name, value)
+
+    def _key(self):
+        """
+        Internal. Tuple of all data defining this primitive, used for
+        comparison and hashing.
+        """
+        raise NotImplementedError('Abstract method')
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), self._key()))
+
     def __add__(self, b):
         """Translation."""
         raise NotImplementedError('Abstract method')
@@ -210,7 +851,7 @@ class Primitive2D(PlanarObject):
 
         The rotation amount is given in degrees.
         """
-        return Object2D([p.rotate(deg) for p in self.primitives])
+        raise NotImplementedError('Abstract method')
 
     def mirror(self, mirror_axes):
         """
@@ -247,17 +888,46 @@ class Primitive2D(PlanarObject):
         """Render into an Object2D."""
         return Object2D([self])
 
+    def set_parent(self, parent, own_position):
+        """
+        Save a reference to this primitive's parent, ie. the WallReference it
+        was added to, see `PlanarObject.set_parent`. Primitives don't have any
+        parameters to convert.
+
+        Automatically called by WallReference.add_child.
+        """
+
+        if self.parent is not None:
+            return
+
+        object.__setattr__(self, 'parent', parent)
+        object.__setattr__(self, 'own_position', own_position)
+
 
 class Line(Primitive2D):
     """
     A simple line primitive.
     """
 
+    __slots__ = ('_start', '_end')
+    _kind = Object2D._KIND_LINE
+
     def __init__(self, start, end, layer=Layer('cutout')):
         super(Line, self).__init__(layer)
 
-        self.start = start
-        self.end = end
+        object.__setattr__(self, '_start', _point(start))
+        object.__setattr__(self, '_end', _point(end))
+
+    @property
+    def start(self):
+        return np.array(self._start)
+
+    @property
+    def end(self):
+        return np.array(self._end)
+
+    def _key(self):
+        return (self._start, self._end, self.layer)
 
     def __add__(self, b):
         return Line(self.start + b, self.end + b, layer=self.layer)
@@ -271,22 +941,108 @@ class Line(Primitive2D):
     def scale(self, fac):
         return Line(self.start * fac, self.end * fac, layer=self.layer)
     def reverse(self):
-        return Line(self.end, self.start, layer=self.layer)
+        return Line(self._end, self._start, layer=self.layer)
     def bounding_box(self):
         vmin = min_vec(self.start, self.end)
         vmax = max_vec(self.start, self.end)
         return (vmin, vmax)
 
+def _points(v):
+    """
+    Convert a sequence of 2D vectors to a tuple of float tuples.
+    """
+
+    return tuple(tuple(p) for p in np.asarray(v, dtype=float).reshape(-1, 2).tolist())
+
+class Polyline(Primitive2D):
+    """
+    A primitive connecting a sequence of points by straight lines.
+
+    Equivalent to a chain of `Line`s, but stored and exported as a single
+    object.
+    """
+
+    __slots__ = ('_points',)
+    _kind = Object2D._KIND_POLYLINE
+
+    def __init__(self, points, layer=Layer('cutout')):
+        super(Polyline, self).__init__(layer)
+
+        object.__setattr__(self, '_points', _points(points))
+        assert len(self._points) >= 2
+
+    @property
+    def points(self):
+        return np.array(self._points)
+
+    @property
+    def start(self):
+        return np.array(self._points[0])
+
+    @property
+    def end(self):
+        return np.array(self._points[-1])
+
+    def _key(self):
+        return (self._points, self.layer)
+
+    def _reversed_points(self):
+        return self._points[::-1]
+
+    def __add__(self, b):
+        return type(self)(np.add(self.points, b), layer=self.layer)
+    def __sub__(self, b):
+        return type(self)(np.subtract(self.points, b), layer=self.layer)
+    def rotate(self, deg):
+        return type(self)([DIR2.rotate(p, deg) for p in self._points], layer=self.layer)
+    def mirror(self, mirror_axes):
+        fac = mirror_array_bool_to_factor(mirror_axes)
+        return type(self)(np.multiply(self.points, fac), layer=self.layer)
+    def scale(self, fac):
+        return type(self)(np.multiply(self.points, fac), layer=self.layer)
+    def reverse(self):
+        return type(self)(self._reversed_points(), layer=self.layer)
+    def bounding_box(self):
+        return (np.min(self.points, axis=0), np.max(self.points, axis=0))
+
+class Polygon(Polyline):
+    """
+    A closed polyline, the last point is connected to the first one.
+
+    The points are given without repeating the first one at the end.
+    """
+
+    __slots__ = ()
+    _kind = Object2D._KIND_POLYGON
+
+    @property
+    def end(self):
+        return np.array(self._points[0])
+
+    def _reversed_points(self):
+        # keep the start point
+        return self._points[:1] + self._points[:0:-1]
+
 class Circle(Primitive2D):
     """
     A simple circle primitive.
     """
 
+    __slots__ = ('_center', 'radius')
+    _kind = Object2D._KIND_CIRCLE
+
     def __init__(self, center, radius, layer=Layer('cutout')):
         super(Circle, self).__init__(layer)
 
-        self.center = center
-        self.radius = radius
+        object.__setattr__(self, '_center', _point(center))
+        object.__setattr__(self, 'radius', radius)
+
+    @property
+    def center(self):
+        return np.array(self._center)
+
+    def _key(self):
+        return (self._center, self.radius, self.layer)
 
     def __add__(self, b):
         return Circle(self.center + b, self.radius, layer=self.layer)
@@ -304,8 +1060,8 @@ class Circle(Primitive2D):
         return self
 
     def bounding_box(self):
-        vmin = min_vec(self.center - np.array([self.radius, self.radius]))
-        vmax = max_vec(self.center + np.array([self.radius, self.radius]))
+        vmin = self.center - self.radius
+        vmax = self.center + self.radius
         return (vmin, vmax)
 
 class ArcPath(Primitive2D):
@@ -316,14 +1072,28 @@ class ArcPath(Primitive2D):
     drawing circle segments.
     """
 
+    __slots__ = ('_start', '_end', 'radius', 'large_arc', 'sweep')
+    _kind = Object2D._KIND_ARC
+
     def __init__(self, start, end, radius, large_arc=True, sweep=True, layer=Layer('cutout')):
         super(ArcPath, self).__init__(layer)
 
-        self.start = start
-        self.end = end
-        self.radius = radius
-        self.large_arc = large_arc
-        self.sweep = sweep
+        object.__setattr__(self, '_start', _point(start))
+        object.__setattr__(self, '_end', _point(end))
+        object.__setattr__(self, 'radius', radius)
+        object.__setattr__(self, 'large_arc', large_arc)
+        object.__setattr__(self, 'sweep', sweep)
+
+    @property
+    def start(self):
+        return np.array(self._start)
+
+    @property
+    def end(self):
+        return np.array(self._end)
+
+    def _key(self):
+        return (self._start, self._end, self.radius, self.large_arc, self.sweep, self.layer)
 
     def __add__(self, b):
         return ArcPath(self.start + b, self.end + b, self.radius, self.large_arc, self.sweep, layer=self.layer)
@@ -338,22 +1108,11 @@ class ArcPath(Primitive2D):
     def scale(self, fac):
         return ArcPath(self.start * fac, self.end * fac, self.radius * fac, self.large_arc, self.sweep, layer=self.layer)
     def reverse(self):
-        return ArcPath(self.end, self.start, self.radius, self.large_arc, not self.sweep, layer=self.layer)
+        return ArcPath(self._end, self._start, self.radius, self.large_arc, not self.sweep, layer=self.layer)
 
     def bounding_box(self):
-
-        a = svgpathtools.Arc(
-                complex(*self.start),
-                complex(self.radius, self.radius),
-                0,
-                self.large_arc,
-                self.sweep,
-                complex(*self.end)
-            )
-
-        min_x, max_x, min_y, max_y = a.bbox()
-
-        return (np.array([min_x, min_y]), np.array([max_x, max_y]))
+        vmin, vmax = arc_bounding_boxes(self.start, self.end, self.radius, self.large_arc, self.sweep)
+        return (vmin[0], vmax[0])
 
     @staticmethod
     def from_center_angle(center, angle_start, angle_end, radius, layer=Layer('cutout')):
@@ -374,12 +1133,22 @@ class Text(Primitive2D):
     A text primitive.
     """
 
+    __slots__ = ('_position', 'text', 'fontsize')
+    _kind = Object2D._KIND_TEXT
+
     def __init__(self, position, text, fontsize=5, layer=Layer('info')):
         super(Text, self).__init__(layer)
 
-        self.position = position
-        self.text = text
-        self.fontsize = fontsize
+        object.__setattr__(self, '_position', _point(position))
+        object.__setattr__(self, 'text', text)
+        object.__setattr__(self, 'fontsize', fontsize)
+
+    @property
+    def position(self):
+        return np.array(self._position)
+
+    def _key(self):
+        return (self._position, self.text, self.fontsize, self.layer)
 
     def __add__(self, b):
         return Text(self.position + b, self.text, self.fontsize, layer=self.layer)
@@ -0,0 +1,223 @@
+"""
+Compact, versioned snapshots of configured boxes, see `Box.dumps`.
+
+Box trees are deeply nested object graphs (reference chains, counterparts,
+parent links), which the default pickle implementation serializes
+recursively, quickly exceeding the recursion limit for large boxes. Snapshots
+therefore store each of LaserGen's objects as a separate entry, referencing
+other objects by index, and set the objects' states after loading all
+entries.
+
+Snapshots are pickles. Loading only accepts LaserGen classes, numpy arrays,
+dtypes and scalars and a few builtin types, so a snapshot can't call
+arbitrary functions. Still only load snapshots from trusted sources: the
+allowed classes' constructors run with data taken from the snapshot.
+"""
+
+import builtins
+import io
+import pickle
+import struct
+import zlib
+
+import numpy as np
+
+from .util import gc_paused
+
+
+MAGIC = b'LGBOX'
+
+# increase when changing the stored data in an incompatible way
+VERSION = 2
+
+
+def dumps(obj):
+    """
+    Serialize an object and everything it references into a snapshot.
+
+    Snapshots are pickles, only load snapshots from trusted sources.
+    """
+
+    buffer = io.BytesIO()
+    pickler = _SnapshotPickler(buffer, pickle.HIGHEST_PROTOCOL)
+
+    pickler.reducer_override(obj)
+
+    with gc_paused():
+
+        # writing entries registers further objects, write them in batches
+        # until no new objects show up
+        index = 0
+        while index < len(pickler.objects):
+            batch = pickler.objects[index:]
+            pickler.dump([(type(o), _get_state(o)) for o in batch])
+            index += len(batch)
+
+    return MAGIC + struct.pack('>H', VERSION) + zlib.compress(buffer.getvalue())
+
+def loads(snapshot, extra_classes=()):
+    """
+    Load an object from a snapshot created by `dumps`.
+
+    Raises a ValueError if the data is not a snapshot or was created by an
+    incompatible version, and a `pickle.UnpicklingError` if it refers to
+    anything but the classes and functions allowed by `_SnapshotUnpickler`.
+
+    Classes defined outside of LaserGen, eg. own `PlanarObject` subclasses
+    added to walls, have to be allowed by passing them in `extra_classes`.
+
+    Only load snapshots from trusted sources.
+    """
+
+    global _loading
+
+    header_length = len(MAGIC) + 2
+
+    if snapshot[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a LaserGen snapshot.')
+
+    version, = struct.unpack('>H', snapshot[len(MAGIC):header_length])
+
+    if version != VERSION:
+        raise ValueError('Unsupported snapshot version {} (expected {}).'.format(version, VERSION))
+
+    unpickler = _SnapshotUnpickler(io.BytesIO(zlib.decompress(snapshot[header_length:])), extra_classes)
+
+    entries = []
+    outer_loading, _loading = _loading, {}
+
+    try:
+        with gc_paused():
+
+            while True:
+                try:
+                    entries.extend(unpickler.load())
+                except EOFError:
+                    break
+
+            for index, (cls, state) in enumerate(entries):
+
+                obj = _get_entry(index, cls)
+
+                if hasattr(obj, '__setstate__'):
+                    obj.__setstate__(state)
+                else:
+                    obj.__dict__.update(state)
+
+        return _loading[0]
+
+    finally:
+        _loading = outer_loading
+
+def _get_state(obj):
+
+    getstate = getattr(obj, '__getstate__', None)
+
+    # `object.__getstate__` only exists since python 3.11
+    return getstate() if getstate is not None else obj.__dict__
+
+def _is_entry_type(cls):
+    """
+    Return whether instances of a class are stored as separate snapshot
+    entries: all plain LaserGen classes with instance dicts.
+    """
+
+    return cls.__module__.startswith(__package__ + '.') and cls.__new__ is object.__new__ and cls.__dictoffset__ != 0
+
+
+# objects of the snapshot being loaded by entry index, see `_get_entry`
+_loading = None
+
+def _get_entry(index, cls):
+    """
+    Return the object of the given entry of the snapshot being loaded,
+    creating an empty instance on first use. Its state is set after all
+    entries have been loaded.
+    """
+
+    obj = _loading.get(index)
+
+    if obj is None:
+        obj = cls.__new__(cls)
+        _loading[index] = obj
+
+    return obj
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    Pickler replacing entry objects by references to their entry index.
+    """
+
+    def __init__(self, file, protocol):
+        super().__init__(file, protocol)
+        self.objects = []
+        self._indices = {}
+        self._entry_types = {}
+
+    def reducer_override(self, obj):
+
+        cls = type(obj)
+        is_entry = self._entry_types.get(cls)
+
+        if is_entry is None:
+            is_entry = self._entry_types[cls] = _is_entry_type(cls)
+
+        if not is_entry:
+            return NotImplemented
+
+        index = self._indices.get(id(obj))
+
+        if index is None:
+            index = len(self.objects)
+            self._indices[id(obj)] = index
+            self.objects.append(obj)
+
+        return (_get_entry, (index, cls))
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    Unpickler restricted to the globals snapshots may refer to: LaserGen
+    classes, `_get_entry`, numpy arrays, dtypes and scalars with the functions
+    reconstructing them, plain builtin types and the given extra classes.
+    """
+
+    # module-level functions numpy pickles arrays and scalars with
+    _NUMPY_FUNCTIONS = frozenset(['_reconstruct', 'scalar', '_frombuffer'])
+
+    _BUILTIN_TYPES = frozenset([
+            'bool', 'int', 'float', 'complex', 'str', 'bytes', 'bytearray',
+            'tuple', 'list', 'dict', 'set', 'frozenset', 'slice', 'range',
+        ])
+
+    def __init__(self, file, extra_classes=()):
+        super().__init__(file)
+        self._extra_classes = {(cls.__module__, cls.__qualname__): cls for cls in extra_classes}
+
+    def find_class(self, module, name):
+
+        if (module, name) in self._extra_classes:
+            return self._extra_classes[(module, name)]
+
+        top = module.partition('.')[0]
+
+        # dotted names would give access to attributes of allowed objects
+        if '.' not in name:
+
+            if top == __package__:
+                obj = super().find_class(module, name)
+                if obj is _get_entry or (isinstance(obj, type) and obj.__module__.partition('.')[0] == __package__):
+                    return obj
+
+            elif top == 'numpy':
+                obj = super().find_class(module, name)
+                if isinstance(obj, type) and (obj is np.ndarray or issubclass(obj, (np.dtype, np.generic))):
+                    return obj
+                if name in self._NUMPY_FUNCTIONS and getattr(obj, '__module__', '').partition('.')[0] == 'numpy':
+                    return obj
+
+            elif module == 'builtins' and name in self._BUILTIN_TYPES:
+                return getattr(builtins, name)
+
+        raise pickle.UnpicklingError('{}.{} is not allowed in snapshots, own classes need to be passed as extra_classes.'.format(module, name))
@@ -0,0 +1,165 @@
+import itertools
+import time
+
+from .box import Box
+from .export import place_2d_objects, export_svg_with_paths
+from .util import update_file
+
+
+def parameter_grid(grid):
+    """
+    Iterate over all combinations of the given parameter values.
+
+    `grid` maps parameter names to lists of values. Yields one dict per
+    combination, mapping each name to a value. The last parameter varies
+    fastest.
+    """
+
+    names = list(grid)
+
+    for values in itertools.product(*(grid[n] for n in names)):
+        yield dict(zip(names, values))
+
+
+class SweepStats():
+    """
+    Statistics of a `sweep` run.
+
+    `variants` is the number of rendered variants, `rebuilds` the number of
+    variants which had to be configured from scratch and `elapsed` the total
+    time in seconds, including the exporter.
+    """
+
+    def __init__(self):
+        self.variants = 0
+        self.rebuilds = 0
+        self.elapsed = 0.
+
+    @property
+    def variants_per_second(self):
+        if self.elapsed == 0:
+            return 0.
+        return self.variants / self.elapsed
+
+    def __str__(self):
+        return '{variants} variants ({rebuilds} rebuilt) in {elapsed:.2f}s, {rate:.1f} variants/s'.format(
+                variants = self.variants,
+                rebuilds = self.rebuilds,
+                elapsed  = self.elapsed,
+                rate     = self.variants_per_second,
+            )
+
+
+def sweep(design, grid, config, exporter=None, decorate=None):
+    """
+    Render a family of boxes built by the same design function.
+
+    `design` is called with the parameters as keyword arguments and returns
+    an unconfigured box, ie. after subdividing but before calling
+    `configure`. `grid` maps parameter names to lists of values, see
+    `parameter_grid`. Alternatively it may be an iterable of parameter dicts.
+
+    The first variant is configured as usual. Following variants with the
+    same topology (box types, subdivisions and bound sizes) are not
+    configured, instead the sizes of the first box are changed by
+    `Box.set_size`. Thus only the changed parts are constructed and rendered
+    again, and tooth layouts of edges with unchanged lengths are reused. A
+    variant with a different topology is configured from scratch and used
+    for the following variants. Boxes containing grids, see
+    `Box.subdivide_grid`, are always configured from scratch.
+
+    `decorate` is called with the box and the parameters whenever a box has
+    been configured from scratch, to add children. These children are kept
+    for the following variants, see `Box.set_size`.
+
+    For every variant `exporter` is called with the parameters and the list
+    of rendered walls as returned by `Box.render`. Rendered walls are not
+    kept, so the memory use doesn't depend on the number of variants.
+
+    Returns a `SweepStats` object.
+    """
+
+    if isinstance(grid, dict):
+        grid = parameter_grid(grid)
+
+    stats = SweepStats()
+    start = time.perf_counter()
+
+    box = None
+
+    for params in grid:
+
+        new_box = design(**params)
+        changes = _get_size_changes(box, new_box) if box is not None else None
+
+        if changes is None:
+            box = new_box
+            box.configure(config)
+            stats.rebuilds += 1
+
+            if decorate is not None:
+                decorate(box, params)
+
+        elif changes:
+            Box._set_sizes(changes, config)
+
+        objects = box.render(config)
+
+        if exporter is not None:
+            exporter(params, objects)
+
+        stats.variants += 1
+
+    stats.elapsed = time.perf_counter() - start
+
+    return stats
+
+def svg_file_exporter(filename, config, **kwargs):
+    """
+    Create an exporter for `sweep`, writing each variant to an SVG file.
+
+    `filename` is formatted with the parameters, eg. `'box-{width}.svg'`.
+    Additional keyword arguments are passed to `export_svg_with_paths`.
+    """
+
+    def exporter(params, objects):
+        svg = export_svg_with_paths(place_2d_objects(objects, config), config, **kwargs)
+        update_file(filename.format(**params), svg)
+
+    return exporter
+
+def _get_size_changes(box, new_box):
+    """
+    Compare the configured sizes of two box trees.
+
+    Returns a list of `(box, axis_index, value)` tuples for `Box._set_sizes`
+    changing `box`'s sizes to `new_box`'s, or None if the trees' topologies
+    differ.
+    """
+
+    boxes = box._get_boxes()
+    new_boxes = new_box._get_boxes()
+
+    if len(boxes) != len(new_boxes):
+        return None
+
+    changes = []
+
+    for b, n in zip(boxes, new_boxes):
+
+        if type(b) is not type(n) or len(b.subboxes) != len(n.subboxes) or b._grid != n._grid:
+            return None
+
+        for i in range(3):
+
+            if (b.size[i] == 'ref') != (n.size[i] == 'ref'):
+                return None
+
+            if type(b.size[i]) is not type(n.size[i]) or b.size[i] != n.size[i]:
+                changes.append((b, i, n.size[i]))
+
+    # grids can't be resized, see `Box.subdivide_grid`
+    if changes and any(b._grid is not None for b in boxes):
+        return None
+
+    return changes
@@ -1,6 +1,17 @@
+import contextlib
+import gc
+import math
 import numpy as np
 
 class DIR():
+    """
+    Direction constants for 3D.
+
+    Directions are numpy arrays. Internally each direction also has an integer
+    code, its index in `DIRS`, which is used to look up precomputed per
+    direction data instead of comparing arrays elementwise.
+    """
+
     UP    = np.array([ 0, 1, 0])
     DOWN  = np.array([ 0,-1, 0])
     LEFT  = np.array([-1, 0, 0])
@@ -10,24 +21,37 @@ class DIR():
 
     AXES = [RIGHT, UP, FRONT]
     DIRS = [RIGHT, LEFT, UP, DOWN, FRONT, BACK]
+    NAMES = ['RIGHT', 'LEFT', 'UP', 'DOWN', 'FRONT', 'BACK']
+
+    def code(d):
+        """
+        Return the integer code of direction `d`, ie. its index in `DIRS`, or
+        None if `d` is not a direction.
+        """
+
+        # fast path for the direction constants themselves
+        c = DIR._IDS.get(id(d))
+        if c is not None and DIR.DIRS[c] is d:
+            return c
+
+        try:
+            if type(d) is not np.ndarray:
+                d = np.asarray(d)
+            return DIR._CODES.get(tuple(d.tolist()))
+        except TypeError:
+            return None
 
     def is_dir(d):
-        for i in DIR.DIRS:
-            if (d == i).all():
-                return True
-        return False
+        return DIR.code(d) is not None
 
     def is_axis(d):
-        for i in DIR.AXES:
-            if (d == i).all():
-                return True
-        return False
+        c = DIR.code(d)
+        return c is not None and c % 2 == 0
 
     def dir_to_name(d):
-        dirs = {k:v for k,v in DIR.__dict__.items() if k in ['UP', 'DOWN', 'LEFT', 'RIGHT', 'FRONT', 'BACK']}
-        for k,v in dirs.items():
-            if (v == d).all():
-                return k
+        c = DIR.code(d)
+        if c is not None:
+            return DIR.NAMES[c]
 
     def dir_to_axis_name(d):
         if not isinstance(d, str):
@@ -42,31 +66,35 @@ class DIR():
             }[d]
 
     def perpendicular_dirs(d):
-        assert DIR.is_dir(d)
-        index = None
-        for i,a in enumerate(DIR.AXES):
-            if (a==abs(d)).all():
-                index = i
-                break
-        assert index is not None
-        j,k = [DIR.AXES[i] for i in range(3) if i != index]
-        return [j,-j,k,-k]
+        c = DIR.code(d)
+        assert c is not None
+        return list(DIR._PERPENDICULAR_DIRS[c])
 
     def perpendicular_axes(d):
-        assert DIR.is_dir(d)
-        index = None
-        for i,a in enumerate(DIR.AXES):
-            if (a==abs(d)).all():
-                index = i
-                break
-        assert index is not None
-        return [DIR.AXES[i] for i in range(3) if i != index]
+        c = DIR.code(d)
+        assert c is not None
+        return list(DIR._PERPENDICULAR_AXES[c])
 
     def project_along_axis(vec, axis):
-        assert DIR.is_dir(axis)
-        return np.array([v for v,a in zip(vec, axis) if a == 0])
+        c = DIR.code(axis)
+        assert c is not None
+        if type(vec) is np.ndarray:
+            return vec[DIR._PROJECTION_INDEX_ARRAYS[c]]
+        return np.array([vec[i] for i in DIR._PROJECTION_INDICES[c]])
+
+# lookup tables, indexed by direction code
+DIR._CODES = {tuple(d): c for c, d in enumerate(DIR.DIRS)}
+DIR._IDS = {id(d): c for c, d in enumerate(DIR.DIRS)}
+DIR._PERPENDICULAR_AXES = [[a for a in DIR.AXES if not (a == abs(d)).all()] for d in DIR.DIRS]
+DIR._PERPENDICULAR_DIRS = [[j, -j, k, -k] for j, k in DIR._PERPENDICULAR_AXES]
+DIR._PROJECTION_INDICES = [[i for i in range(3) if d[i] == 0] for d in DIR.DIRS]
+DIR._PROJECTION_INDEX_ARRAYS = [np.array(i) for i in DIR._PROJECTION_INDICES]
 
 class DIR2():
+    """
+    Direction constants for 2D, see `DIR`.
+    """
+
     UP    = np.array([ 0, 1])
     DOWN  = np.array([ 0,-1])
     LEFT  = np.array([-1, 0])
@@ -74,25 +102,38 @@ class DIR2():
 
     AXES = [RIGHT, UP]
     DIRS = [RIGHT, LEFT, UP, DOWN]
+    NAMES = ['RIGHT', 'LEFT', 'UP', 'DOWN']
+
+    def code(d):
+        """
+        Return the integer code of direction `d`, ie. its index in `DIRS`, or
+        None if `d` is not a direction.
+        """
+
+        # fast path for the direction constants themselves
+        c = DIR2._IDS.get(id(d))
+        if c is not None and DIR2.DIRS[c] is d:
+            return c
+
+        try:
+            if type(d) is not np.ndarray:
+                d = np.asarray(d)
+            return DIR2._CODES.get(tuple(d.tolist()))
+        except TypeError:
+            return None
 
     def is_dir(d):
-        for i in DIR2.DIRS:
-            if (d == i).all():
-                return True
-        return False
+        return DIR2.code(d) is not None
 
     def is_axis(d):
-        for i in DIR2.AXES:
-            if (d == i).all():
-                return True
-        return False
+        c = DIR2.code(d)
+        return c is not None and c % 2 == 0
 
     def project_along_axis(vec, axis):
-        assert DIR2.is_dir(axis)
-        if axis[0] == 0:
-            return vec[0]
-        else:
-            return vec[1]
+        c = DIR2.code(axis)
+        assert c is not None
+        # horizontal directions project to the Y coordinate
+        return vec[1] if c < 2 else vec[0]
 
     def orthon(v):
         # rotate by 90 deg CCW
@@ -115,6 +156,9 @@ class DIR2():
             R = np.matrix([[c, -s], [s, c]])
             return np.array([v[0]*c - v[1]*s, v[0]*s + v[1]*c])
 
+DIR2._CODES = {tuple(d): c for c, d in enumerate(DIR2.DIRS)}
+DIR2._IDS = {id(d): c for c, d in enumerate(DIR2.DIRS)}
+
 def mirror_array_bool_to_factor(v):
     return np.array([(-1 if b else 1) for b in v])
 
@@ -130,8 +174,78 @@ def max_vec(*args):
         max(v[1] for v in args)
         ])
 
+def arc_bounding_boxes(start, end, radius, large_arc, sweep):
+    """
+    Calculate axis aligned bounding boxes for circular arcs given in SVG arc
+    notation, ie. by their endpoints, radius, large arc and sweep flags.
+
+    All parameters are arrays with one entry (row) per arc, the calculation is
+    done for all arcs at once. As for SVG, radii that are too small to connect
+    the endpoints are scaled up.
+
+    Return value is `(min_corners, max_corners)`, both of shape `(n, 2)`.
+    """
+
+    start = np.asarray(start, dtype=float).reshape(-1, 2)
+    end = np.asarray(end, dtype=float).reshape(-1, 2)
+    radius = np.abs(np.asarray(radius, dtype=float)).reshape(-1)
+    large_arc = np.asarray(large_arc, dtype=bool).reshape(-1)
+    sweep = np.asarray(sweep, dtype=bool).reshape(-1)
+
+    vmin = np.minimum(start, end)
+    vmax = np.maximum(start, end)
+
+    # arcs with coinciding endpoints or zero radius are rendered as straight
+    # lines (or not at all), so the endpoints suffice
+    half = (start - end) / 2
+    dist_sq = (half * half).sum(axis=1)
+    valid = (dist_sq > 0) & (radius > 0)
+
+    if not valid.any():
+        return (vmin, vmax)
+
+    half = half[valid]
+    dist_sq = dist_sq[valid]
+    r = np.maximum(radius[valid], np.sqrt(dist_sq))
+    s, e = start[valid], end[valid]
+    sw = sweep[valid]
+
+    # center, see the SVG implementation notes on endpoint to center
+    # parameterization
+    sign = np.where(large_arc[valid] == sw, -1., 1.)
+    coef = sign * np.sqrt(np.maximum(0, (r * r - dist_sq) / dist_sq))
+    center = (s + e) / 2 + coef[:,np.newaxis] * np.stack([half[:,1], -half[:,0]], axis=1)
+
+    theta_start = np.arctan2(s[:,1] - center[:,1], s[:,0] - center[:,0])
+    theta_end = np.arctan2(e[:,1] - center[:,1], e[:,0] - center[:,0])
+
+    # swept angle, positive for increasing angles
+    span = np.where(sw, theta_end - theta_start, theta_start - theta_end) % (2 * np.pi)
+
+    sub_min = vmin[valid]
+    sub_max = vmax[valid]
+
+    # add the axis extreme points lying on the arc
+    for angle, offset in [(0, np.array([1, 0])), (np.pi/2, np.array([0, 1])), (np.pi, np.array([-1, 0])), (3*np.pi/2, np.array([0, -1]))]:
+        passed = np.where(sw, angle - theta_start, theta_start - angle) % (2 * np.pi) <= span
+        p = center + r[:,np.newaxis] * offset
+        sub_min = np.where(passed[:,np.newaxis], np.minimum(sub_min, p), sub_min)
+        sub_max = np.where(passed[:,np.newaxis], np.maximum(sub_max, p), sub_max)
+
+    vmin[valid] = sub_min
+    vmax[valid] = sub_max
+
+    return (vmin, vmax)
+
 def almost_equal(a, b, epsilon=1E-10):
-    return np.linalg.norm(a-b) < epsilon
+    return np.linalg.norm(np.subtract(a, b)) < epsilon
+
+def almost_equal_2d(a, b, epsilon=1E-10):
+    """
+    Same as `almost_equal`, specialized for 2D points. Avoids numpy overhead
+    for the many point comparisons done when joining paths.
+    """
+    return math.hypot(a[0] - b[0], a[1] - b[1]) < epsilon
 
 def update_file(filepath, new):
     """
@@ -149,3 +263,60 @@ def update_file(filepath, new):
     if old != new:
         with open(filepath, 'w') as f:
             f.write(new)
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Disable the cyclic garbage collector while creating many objects at once.
+    It would otherwise run repeatedly without finding anything to collect.
+    """
+
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+# function and items of the running `parallel_map`, inherited by the forked
+# worker processes
+_parallel_task = None
+
+def parallel_map(func, items, workers):
+    """
+    Apply a function to all items in a pool of forked worker processes.
+
+    The workers inherit the function and items when forking, so only item
+    indices and results are transferred. Neither the function nor the items
+    need to be picklable, only the results. Results are returned in the order
+    of the items.
+
+    Falls back to a plain loop if `workers` is None or less than 2, if the
+    platform can't fork (eg. Windows), or if called from a daemonic process,
+    eg. a pool worker, which can't start processes.
+    """
+
+    global _parallel_task
+
+    import multiprocessing
+
+    items = list(items)
+
+    if (workers is None or workers < 2 or len(items) < 2
+            or 'fork' not in multiprocessing.get_all_start_methods()
+            or multiprocessing.current_process().daemon):
+        return [func(x) for x in items]
+
+    _parallel_task = (func, items)
+
+    try:
+        with multiprocessing.get_context('fork').Pool(min(workers, len(items))) as pool:
+            return pool.map(_parallel_call, range(len(items)))
+    finally:
+        _parallel_task = None
+
+def _parallel_call(index):
+    func, items = _parallel_task
+    return func(items[index])
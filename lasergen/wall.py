@@ -1,9 +1,10 @@
 import numpy as np
 import math
 
-from .util import DIR, DIR2
+from . import diagnostics
+from .util import DIR, DIR2, parallel_map
 from .units import Frac
-from .primitive import Object2D, PlanarObject, Text
+from .primitive import Object2DBuilder, PlanarObject, Primitive2D, Text
 from .edge import EDGE_STYLE, EDGE_ELEMENT_STYLE, _EdgeElement, Edge
 
 
@@ -12,6 +13,10 @@ class Wall(PlanarObject):
     Object representing a wall.
 
     Walls contain edges and other 2D children.
+
+    The rendered Object2D is cached per config fingerprint and invalidated
+    when the wall, one of its edges (see `Edge.render`) or one of its children
+    changes.
     """
 
     #size = None
@@ -23,13 +28,24 @@ class Wall(PlanarObject):
 
         self.children = []
 
+        self._render_cache = None
+
         self._construct_edges()
 
+        for e in self.edges:
+            e.dereference().wall = self
+
         if name is None:
             self.name = type(self).__name__
         else:
             self.name = name
 
+    def __getstate__(self):
+        # the cache is recalculated on demand, don't store it in snapshots
+        state = self.__dict__.copy()
+        state['_render_cache'] = None
+        return state
+
     def get_edge_by_direction(self, v):
         """
         Get the edge lying in the specified direction.
@@ -40,16 +56,121 @@ class Wall(PlanarObject):
 
         return self.edges[self._get_edge_index_by_direction(v)]
 
+    # edge indices UP, DOWN, LEFT, RIGHT by direction code
+    _EDGE_INDICES = [3, 2, 0, 1]
+
     @staticmethod
     def _get_edge_index_by_direction(v):
-        if (v == DIR2.UP).all():    return 0
-        if (v == DIR2.DOWN).all():  return 1
-        if (v == DIR2.LEFT).all():  return 2
-        if (v == DIR2.RIGHT).all(): return 3
+        c = DIR2.code(v)
+        if c is not None:
+            return Wall._EDGE_INDICES[c]
 
     def render(self, config):
+        """
+        Render the wall's edges and children into an Object2D, reusing the last
+        result if nothing changed since.
+        """
+
+        key = self._render_key(config.fingerprint())
+
+        if self._render_cache is None or self._render_cache[0] != key:
+            with diagnostics.capture() as records:
+                rendered = self._render(config)
+            self._render_cache = (key, rendered, records)
+
+        else:
+            diagnostics.replay(config, self._render_cache[2])
+
+        return self._render_cache[1]._copy()
+
+    @staticmethod
+    def _render_walls(walls, config, workers=None, process=None):
+        """
+        Render the given walls, like calling `render` on each of them.
+
+        If `process` is given, it is called with each wall's index and rendered
+        object, and the list of its results is returned instead.
+
+        With more than one worker, rendering and `process` run in a pool of
+        forked processes, see `parallel_map`. Only newly rendered objects,
+        results of `process` and diagnostic records are sent back. Rendered
+        objects are stored in the walls' caches and the records are reported in
+        wall order, so output and messages are the same as running serially.
+        Edge caches are only updated in the workers.
+        """
+
+        fingerprint = config.fingerprint()
+        keys = [w._render_key(fingerprint) for w in walls]
+        stale = [w._render_cache is None or w._render_cache[0] != key for w, key in zip(walls, keys)]
+
+        def work(index):
+
+            rendered = records = None
+
+            if stale[index]:
+                with diagnostics.capture(mute=True) as records:
+                    rendered = walls[index]._render(config)
+                obj = rendered._copy()
+            else:
+                obj = walls[index]._render_cache[1]._copy()
+
+            if process is None:
+                return (rendered, records, None, None)
+
+            with diagnostics.capture(mute=True) as process_records:
+                result = process(index, obj)
+
+            return (rendered, records, result, process_records)
+
+        results = None
+        if workers is not None and workers > 1:
+            results = parallel_map(work, range(len(walls)), workers)
+
+        output = []
+
+        for index, (wall, key) in enumerate(zip(walls, keys)):
+
+            if results is None:
+                obj = wall.render(config)
+                output.append(obj if process is None else process(index, obj))
+                continue
 
-        l = Object2D()
+            rendered, records, result, process_records = results[index]
+
+            if rendered is not None:
+                wall._render_cache = (key, rendered, records)
+                diagnostics.replay(config, records, echo=True)
+                obj = rendered._copy()
+            else:
+                obj = wall.render(config)
+
+            if process is None:
+                output.append(obj)
+            else:
+                diagnostics.replay(config, process_records, echo=True)
+                output.append(result)
+
+        return output
+
+    def _render_key(self, fingerprint):
+        """
+        Return a key identifying everything this wall's rendering depends on.
+        """
+
+        return (
+                fingerprint,
+                self._revision,
+                tuple(e.dereference()._render_key(fingerprint) for e in self.edges),
+                # edge children, eg. cutout edges, depend on their counterparts
+                tuple(child._render_key(fingerprint) if isinstance(child, Edge) else child._revision for child, _, _ in self.children),
+            )
+
+    def _render(self, config):
+        """
+        Internal, uncached implementation of `render`.
+        """
+
+        l = Object2DBuilder()
 
         # TODO implement render for edge references?
         l.extend(self.edges[0].dereference().render(config)           + np.array([0, self.size[1]]))
@@ -63,7 +184,7 @@ class Wall(PlanarObject):
         if config.print_wall_names:
             l.append(Text(np.array([5,5]), self.name))
 
-        return l
+        return l.build()
 
     def add_child(self, child, pos, mirrored=np.array([False, False])):
         """
@@ -75,6 +196,29 @@ class Wall(PlanarObject):
 
         pos = Frac.array_total_length(pos, self.size)
         self.children.append((child, pos, mirrored))
+        self._revision += 1
+
+    def _update_children_positions(self):
+        """
+        Recalculate the positions of children added through wall references,
+        after the references have been moved.
+        """
+
+        for index, (child, pos, mirrored) in enumerate(self.children):
+
+            parent = getattr(child, 'parent', None)
+            if parent is None:
+                continue
+
+            # same arithmetic as the `add_child` calls along the chain
+            new_pos = child.own_position if isinstance(child, Primitive2D) else child.position
+            while isinstance(parent, WallReference):
+                new_pos = parent.position + new_pos
+                parent = parent.target
+
+            if parent is self and (new_pos != pos).any():
+                self.children[index] = (child, new_pos, mirrored)
+                self._revision += 1
 
     def get_reference(self, pos=np.array([0,0]), size=None, mirror_children=np.array([False, False]), projection_dir=None):
         """
@@ -162,6 +306,9 @@ class WallReference():
         self.projection_dir = projection_dir
         self.name = name
 
+        # the reference chain collapsed, see `dereference`
+        self._wall = target.dereference()
+
         self._init_edges_from_target()
 
     def _init_edges_from_target(self):
@@ -225,7 +372,19 @@ class WallReference():
             pos = self.to_local_coords(pos)
         pos = Frac.array_total_length(pos, self.size)
         child.set_parent(self, pos)
-        self.target.add_child(child, self.position + pos, self.mirror_children ^ mirrored)
+
+        # walk the reference chain with the same arithmetic as nested
+        # `add_child` calls would
+        pos = self.position + pos
+        mirrored = self.mirror_children ^ mirrored
+        target = self.target
+
+        while isinstance(target, WallReference):
+            pos = target.position + pos
+            mirrored = target.mirror_children ^ mirrored
+            target = target.target
+
+        target.add_child(child, pos, mirrored)
 
     def get_reference(self, pos=np.array([0,0]), size=None, mirror_children=np.array([False, False]), projection_dir=None):
         """
@@ -241,14 +400,30 @@ class WallReference():
         """
         Returns the eventual wall object this reference points to.
         """
-        return self.target.dereference()
+        return self._wall
 
     def get_total_offset(self):
         """
         Returns the total offset determined by the position of all references
         in the chain.
+
+        The offset is calculated on each call, since `Box.set_size` may move
+        the references in the chain.
         """
-        return self.position + self.target.get_total_offset()
+
+        positions = []
+        target = self
+
+        while isinstance(target, WallReference):
+            positions.append(target.position)
+            target = target.target
+
+        # same arithmetic as nested calls would use
+        offset = target.get_total_offset()
+        for pos in reversed(positions):
+            offset = pos + offset
+
+        return offset
 
     def __str__(self):
         return '[WallRef "{name}" {dir}({posx}, {posy}) / ({sizex}, {sizey})] -> {target}'.format(
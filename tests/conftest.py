@@ -0,0 +1,52 @@
+import pytest
+
+from lasergen.box import ClosedBox
+from lasergen.config import Config
+from lasergen.planar import CircleCutout
+from lasergen.primitive import Circle
+from lasergen.units import Rel
+from lasergen.util import DIR
+
+
+@pytest.fixture
+def config():
+    return Config(6., 10., 3., 3.)
+
+def add_children(box):
+    """
+    Add a primitive child to the first subbox and a planar child to the root
+    box of a box made by `make_box`.
+    """
+
+    box.subboxes[0].get_wall_by_direction(DIR.DOWN).add_child(Circle([0, 0], 2), [10, 10])
+    box.get_wall_by_direction(DIR.UP).add_child(CircleCutout(3), [20, 20])
+
+@pytest.fixture
+def make_box(config):
+    """
+    Factory for a configured `ClosedBox` subdivided along the X axis,
+    optionally with the children of `add_children`.
+    """
+
+    def make_box(width=100, height=80, depth=60, sizes=(Rel(1), Rel(1)), names=None, children=False, name=None):
+        box = ClosedBox(width, height, depth, name=name)
+        box.subdivide(DIR.RIGHT, list(sizes), names)
+        box.configure(config)
+
+        if children:
+            add_children(box)
+
+        return box
+
+    return make_box
+
+@pytest.fixture
+def render_primitives(config):
+    """
+    Render a box and return the primitives of all walls, for comparing boxes.
+    """
+
+    def render_primitives(box):
+        return [o.primitives for o in box.render(config)]
+
+    return render_primitives
@@ -0,0 +1,69 @@
+import inspect
+import sys
+
+from lasergen.box import Box, ClosedBox
+from lasergen.units import Rel
+from lasergen.util import DIR
+
+
+def test_deeply_nested_boxes_dont_need_recursion(config):
+    box = ClosedBox(100, 80, 60)
+    innermost = box
+    for _ in range(200):
+        innermost = innermost.subdivide(DIR.RIGHT, [Rel(1)])[0]
+
+    # leave less stack than a recursive tree traversal would need
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + 100)
+
+    try:
+        box.configure(config)
+        box.set_size(DIR.RIGHT, 120, config)
+        down = innermost.get_wall_by_direction(DIR.DOWN)
+        offset = down.get_total_offset()
+    finally:
+        sys.setrecursionlimit(limit)
+
+    assert down.dereference() is box.get_wall_by_direction(DIR.DOWN).dereference()
+    assert (offset == [0, 0]).all()
+
+def test_mixed_sizes_are_solved(config):
+    box = ClosedBox(300, 100, 60)
+    summed, fixed, relative = box.subdivide(DIR.RIGHT, [None, 50, Rel(2)])
+    summed.subdivide(DIR.RIGHT, [40, 30])
+    fixed.subdivide(DIR.UP, [Rel(1), 30, Rel(3)])
+    relative.subdivide(DIR.FRONT, [Rel(1), Rel(1)])
+    box.configure(config)
+
+    sizes = [(b.name, b.abs_size.tolist(), b.position.tolist()) for b in box._get_boxes()]
+
+    assert sizes == [
+            ('ClosedBox',             [300, 100, 60],   [0, 0, 0]),
+            ('ClosedBox.DIRX0',       [73, 100, 60],    [0, 0, 0]),
+            ('ClosedBox.DIRX0.DIRX0', [40, 100, 60],    [0, 0, 0]),
+            ('ClosedBox.DIRX0.DIRX1', [30, 100, 60],    [43, 0, 0]),
+            ('ClosedBox.DIRX1',       [50, 100, 60],    [76, 0, 0]),
+            ('ClosedBox.DIRX1.DIRY0', [50, 16, 60],     [76, 0, 0]),
+            ('ClosedBox.DIRX1.DIRY1', [50, 30, 60],     [76, 19, 0]),
+            ('ClosedBox.DIRX1.DIRY2', [50, 48, 60],     [76, 52, 0]),
+            ('ClosedBox.DIRX2',       [171, 100, 60],   [129, 0, 0]),
+            ('ClosedBox.DIRX2.DIRZ0', [171, 100, 28.5], [129, 0, 0]),
+            ('ClosedBox.DIRX2.DIRZ1', [171, 100, 28.5], [129, 0, 31.5]),
+        ]
+
+def test_size_solving_visits_each_box_a_constant_number_of_times(config, monkeypatch):
+    box = ClosedBox(1000, 1000, 1000)
+    level = [box]
+    for d in [DIR.RIGHT, DIR.UP, DIR.FRONT]:
+        level = [c for b in level for c in b.subdivide(d, [Rel(1)] * 4)]
+
+    calls = []
+
+    for name in ['_get_sum', '_get_final_sum']:
+        original = getattr(Box, name)
+        monkeypatch.setattr(Box, name, lambda self, i, config, original=original: calls.append(self) or original(self, i, config))
+
+    box.configure(config)
+
+    # one up and at most one down visit per box and axis
+    assert len(calls) <= 3 * 3 * len(box._get_boxes())
@@ -0,0 +1,41 @@
+from lasergen.edge import EDGE_ELEMENT_STYLE
+from lasergen.planar import CircleCutout
+from lasergen.util import DIR
+
+
+def change(box):
+    box.get_wall_by_direction(DIR.FRONT).get_edge_by_direction(DIR.UP).add_element(10, 20, EDGE_ELEMENT_STYLE.FLAT)
+    box.get_wall_by_direction(DIR.BACK).add_child(CircleCutout(2), [30, 30])
+
+
+def test_clone_renders_like_original(make_box, render_primitives):
+    box = make_box(children=True)
+    render_primitives(box)
+
+    assert render_primitives(box.clone()) == render_primitives(box)
+
+def test_changing_clone_leaves_original_unchanged(config, make_box, render_primitives):
+    box = make_box(children=True)
+    expected = render_primitives(box)
+
+    copy = box.clone()
+    copy.set_size(DIR.RIGHT, 140, config)
+    change(copy)
+
+    assert render_primitives(box) == expected
+    assert render_primitives(copy) != expected
+
+    resized = make_box(140, children=True)
+    change(resized)
+
+    assert render_primitives(copy) == render_primitives(resized)
+
+def test_changing_original_leaves_clone_unchanged(config, make_box, render_primitives):
+    box = make_box(children=True)
+    copy = box.clone()
+    expected = render_primitives(copy)
+
+    change(box)
+    box.set_size(DIR.UP, 100, config)
+
+    assert render_primitives(copy) == expected
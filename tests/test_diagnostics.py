@@ -0,0 +1,61 @@
+import numpy as np
+
+from lasergen import diagnostics
+from lasergen.diagnostics import DIAGNOSTIC, Diagnostic, Diagnostics
+from lasergen.export import export_svg_with_paths, place_2d_objects
+from lasergen.primitive import Line, Object2D
+
+
+def test_equal_records_are_stored_once_and_counted(config):
+    config.diagnostics = Diagnostics()
+
+    for _ in range(3):
+        diagnostics.report(config, 'warn', DIAGNOSTIC.TOOTH_LENGTH, 'too short', 'Box.UP.LEFT', 0, (6., 4., 10.))
+    diagnostics.report(config, 'warn', DIAGNOSTIC.TOOTH_LENGTH, 'too short', 'Box.UP.RIGHT', 0, (6., 4., 10.))
+    diagnostics.report(config, 'error', DIAGNOSTIC.COUNTERPART_COUNT, 'mismatch', 'Box.UP.LEFT', None, (2, 3))
+
+    sink = config.diagnostics
+    first = Diagnostic('warn', DIAGNOSTIC.TOOTH_LENGTH, 'too short', 'Box.UP.LEFT', 0, (6., 4., 10.))
+
+    assert len(sink) == 3
+    assert sink.count(first) == 3
+    assert len(sink.filter(code=DIAGNOSTIC.TOOTH_LENGTH)) == 2
+    assert len(sink.filter(level='error')) == 1
+    assert sink.has_errors()
+
+def test_numpy_positions_and_values_are_converted(config):
+    config.diagnostics = Diagnostics()
+
+    diagnostics.report(config, 'warn', DIAGNOSTIC.UNCLOSED_PATH, 'open', None, np.array([1., 2.]), (np.array([3., 4.]), np.float64(5.)))
+    diagnostics.report(config, 'warn', DIAGNOSTIC.UNCLOSED_PATH, 'open', None, np.array([1., 2.]), (np.array([3., 4.]), np.float64(5.)))
+
+    (record,) = config.diagnostics.records
+
+    assert record.position == (1., 2.)
+    assert record.values == ((3., 4.), 5.)
+    assert config.diagnostics.count(record) == 2
+
+def test_unclosed_path_is_reported_with_a_sink(config, make_box):
+    config.diagnostics = Diagnostics()
+
+    objects = make_box().render(config) + [Object2D([Line([0, 0], [5, 5])])]
+    export_svg_with_paths(place_2d_objects(objects, config), config)
+
+    records = config.diagnostics.filter(code=DIAGNOSTIC.UNCLOSED_PATH)
+
+    assert len(records) == 1
+    assert all(type(v) is float for v in records[0].position)
+
+def test_captured_records_are_replayed(config):
+    config.diagnostics = Diagnostics()
+
+    with diagnostics.capture(mute=True) as records:
+        diagnostics.report(config, 'warn', DIAGNOSTIC.TOOTH_LENGTH, 'too short', 'Box.UP.LEFT', 0, (6., 4., 10.))
+
+    assert len(config.diagnostics) == 0
+
+    diagnostics.replay(config, records)
+    diagnostics.replay(config, records)
+
+    assert config.diagnostics.records == records
+    assert config.diagnostics.count(records[0]) == 2
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from lasergen.config import Config
+from lasergen.edge import CutoutEdge, Edge, EDGE_ELEMENT_STYLE, EDGE_STYLE
+from lasergen.primitive import Polygon, Polyline
+from lasergen.util import DIR
+
+
+@pytest.fixture
+def edge(make_box):
+    box = make_box()
+    return box.get_wall_by_direction(DIR.DOWN).get_edge_by_direction(DIR.RIGHT).dereference()
+
+def test_add_element_rejects_overlaps(edge):
+    edge.add_element(10, 20, EDGE_ELEMENT_STYLE.FLAT)
+
+    with pytest.raises(ValueError):
+        edge.add_element(20, 20, EDGE_ELEMENT_STYLE.FLAT)
+
+    assert [(e.pos, e.length) for e in edge.get_elements()] == [(10, 20)]
+
+def test_add_element_keeps_edge_unchanged_if_counterpart_rejects(edge):
+    edge.counterpart.add_element(10, 20, EDGE_ELEMENT_STYLE.FLAT, auto_add_counterpart=False)
+    revision = edge._revision
+
+    with pytest.raises(ValueError):
+        edge.add_element(20, 20, EDGE_ELEMENT_STYLE.FLAT)
+
+    assert edge.get_elements() == []
+    assert edge._revision == revision
+
+def test_toothed_edge_renders_a_single_polyline(config):
+    # 13 elements of 100 / 13 mm: 7 flat ones with one line each, and 6 teeth
+    # with three lines each
+    (polyline,) = Edge(100, np.array([0, 1]), EDGE_STYLE.FLAT, EDGE_STYLE.FLAT).render(config)
+
+    assert type(polyline) is Polyline
+    assert len(polyline.points) == 7 + 6 * 3 + 1
+
+def test_cutout_edge_renders_slots_as_polygons(config):
+    edge = CutoutEdge(100, np.array([1, 0]), EDGE_STYLE.INTERNAL_FLAT, EDGE_STYLE.INTERNAL_FLAT)
+    slots = edge.render(config).primitives
+
+    assert len(slots) == 7
+    assert all(type(p) is Polygon and len(p.points) == 4 for p in slots)
+
+# zero length, just below the minimum tooth width, exact multiples of the
+# tooth widths and lengths in between
+TOOTHED_LENGTHS = [0, 5.999, 6, 9.999, 10, 12, 30, 59.999, 60, 61, 100]
+
+@pytest.mark.parametrize('length', TOOTHED_LENGTHS)
+@pytest.mark.parametrize('odd', [False, True])
+def test_batch_tooth_counts_match_single_ones(config, length, odd):
+    # solved together with other segments, like for all edges of a box
+    lengths = [length, 60, length, 7]
+    odds = [odd, not odd, not odd, odd]
+
+    expected = [Edge._get_tooth_count(config, l, o) for l, o in zip(lengths, odds)]
+
+    assert Edge._solve_tooth_counts(config, lengths, odds) == expected
+
+@pytest.mark.parametrize('length', TOOTHED_LENGTHS)
+@pytest.mark.parametrize('odd', [False, True])
+def test_batch_tooth_counts_abort_like_single_ones(config, length, odd):
+    config.abort_on_tooth_length_error = True
+
+    try:
+        expected = [Edge._get_tooth_count(config, length, odd)]
+    except ValueError:
+        with pytest.raises(ValueError):
+            Edge._solve_tooth_counts(config, [length], [odd])
+    else:
+        assert Edge._solve_tooth_counts(config, [length], [odd]) == expected
+
+def test_element_list_is_prepared_once_per_revision(config, edge, monkeypatch):
+    calls = []
+    prepare = Edge._prepare_element_list
+
+    def counting_prepare(self, config):
+        calls.append(self)
+        return prepare(self, config)
+
+    monkeypatch.setattr(Edge, '_prepare_element_list', counting_prepare)
+
+    counterpart = edge.counterpart.dereference()
+
+    # the counterpart check uses the counterpart's cached list
+    edge.render(config)
+    counterpart.render(config)
+    assert calls == [edge, counterpart]
+
+    edge.add_element(10, 20, EDGE_ELEMENT_STYLE.FLAT)
+    first = edge._get_prepared_element_list(config)
+    assert edge._get_prepared_element_list(config) is first
+
+    edge.set_style(EDGE_ELEMENT_STYLE.FLAT, set_counterpart=False)
+    second = edge._get_prepared_element_list(config)
+    assert second is not first
+
+    assert edge._get_prepared_element_list(Config(4., 8., 3., 3.)) is not second
@@ -0,0 +1,47 @@
+from lasergen.export import _EndpointIndex, accumulate_paths
+from lasergen.primitive import Line, Object2D
+
+
+def test_endpoint_index_finds_points_in_neighbouring_cells():
+    index = _EndpointIndex(epsilon=1E-10)
+    index.add('a', [(0, 0), (5, 5)])
+    index.add('b', [(1, 1), (5, 5)])
+
+    # just across a cell boundary
+    assert index.query((-1E-11, 1E-11)) == ['a']
+    assert index.query((5, 5)) == ['a', 'b']
+    assert index.query((0.5, 0.5)) == []
+
+    index.remove('a')
+    assert index.query((5, 5)) == ['b']
+
+def test_accumulate_paths_joins_nonconsecutive_lines(config):
+    o = Object2D([
+            Line([0, 0], [1, 0]),
+            Line([2, 1], [2, 2]),
+            Line([5, 5], [6, 6]),
+            # joins both paths above, reversed
+            Line([2, 1], [1, 0]),
+        ])
+
+    paths = [(p.finalized, list(p.start_point), list(p.current_point), len(p.objects)) for p in accumulate_paths(o, config)]
+
+    assert paths == [(False, [0, 0], [2, 2], 3), (False, [5, 5], [6, 6], 1)]
+
+def test_accumulate_paths_closes_paths_within_tolerance(config):
+    square = Object2D([
+            Line([0, 0], [1, 0]),
+            Line([1, 1], [0, 1]),
+            Line([1, 0], [1, 1 + 1E-12]),
+            Line([0, 1], [0, 0]),
+        ])
+
+    (path,) = accumulate_paths(square, config)
+
+    assert path.finalized
+    assert len(path.objects) == 4
+
+def test_accumulate_paths_keeps_paths_apart_without_joining(config):
+    o = Object2D([Line([0, 0], [1, 0]), Line([2, 0], [3, 0]), Line([1, 0], [2, 0])])
+
+    assert len(accumulate_paths(o, config, join_nonconsecutive_paths=False)) == 3
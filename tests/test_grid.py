@@ -0,0 +1,22 @@
+import pytest
+
+from lasergen.box import ClosedBox, ToplessBox
+from lasergen.diagnostics import Diagnostics
+from lasergen.export import export_svg_with_paths, place_2d_objects
+from lasergen.units import Rel
+from lasergen.util import DIR
+
+
+@pytest.mark.parametrize('box_type', [ClosedBox, ToplessBox])
+@pytest.mark.parametrize('dirs', [(DIR.RIGHT, DIR.FRONT), (DIR.RIGHT, DIR.UP), (DIR.FRONT, DIR.RIGHT)])
+def test_grid_renders_without_warnings(config, box_type, dirs):
+    config.diagnostics = Diagnostics()
+
+    box = box_type(200, 120, 60, name='G')
+    box.subdivide_grid(dirs[0], [Rel(1)] * 3, dirs[1], [Rel(1)] * 4)
+    box.configure(config)
+
+    svg = export_svg_with_paths(place_2d_objects(box.render(config), config), config)
+
+    assert list(config.diagnostics) == []
+    assert 'warn' not in svg
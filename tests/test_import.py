@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loaded_modules(code):
+    """
+    Run `code` in a fresh interpreter and return the LaserGen, numpy and
+    svgpathtools modules loaded afterwards.
+    """
+
+    code += '\nimport sys\nprint(" ".join(m for m in sys.modules if m.startswith("lasergen") or m in ("numpy", "svgpathtools")))'
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+    return set(output.decode().split())
+
+def test_package_import_loads_no_submodules():
+    assert loaded_modules('import lasergen') == {'lasergen'}
+
+def test_submodules_load_on_attribute_access():
+    modules = loaded_modules('import lasergen\nlasergen.units')
+
+    assert modules - {'numpy'} == {'lasergen', 'lasergen.units'}
+
+def test_export_loads_planar_objects_on_demand():
+    modules = loaded_modules('import lasergen.export')
+
+    assert 'lasergen.export' in modules
+    assert 'lasergen.planar' not in modules
+    assert 'lasergen.box' not in modules
+
+def test_unknown_attributes_raise():
+    import lasergen
+
+    assert 'box' in dir(lasergen)
+    with pytest.raises(AttributeError):
+        lasergen.nonexistent
+
+def test_render_and_export_dont_need_svgpathtools():
+    modules = loaded_modules("""
+from lasergen.box import ClosedBox
+from lasergen.config import Config
+from lasergen.export import export_svg_with_paths, place_2d_objects
+from lasergen.planar import MountingScrewCutout
+from lasergen.util import DIR
+
+c = Config(6., 10., 3., 3.)
+box = ClosedBox(100, 80, 60)
+box.configure(c)
+box.get_wall_by_direction(DIR.BACK).add_child(MountingScrewCutout(6.5, 3, 20, DIR.DOWN), [40, 40, 0])
+export_svg_with_paths(place_2d_objects(box.render(c), c), c)
+""")
+
+    assert 'lasergen.export' in modules
+    assert 'svgpathtools' not in modules
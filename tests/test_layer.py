@@ -0,0 +1,29 @@
+import gc
+import weakref
+
+from lasergen.layer import Layer
+
+
+def test_layers_are_interned():
+    assert Layer('cut', 'warn', ['a']) is Layer('cut', 'warn', ['a'])
+
+def test_unused_layers_are_freed():
+    ref = weakref.ref(Layer('unused', 'warn', ['a']))
+    Layer._combine.cache_clear()
+    gc.collect()
+
+    assert ref() is None
+
+def test_combine_concatenates_warnings():
+    a = Layer.warn('too short')
+    combined = a.combine(a)
+
+    assert combined.warnings == ('too short', 'too short')
+    assert combined.warn_level == 'warn'
+
+def test_combine_merges_name_and_warn_level():
+    combined = Layer.warn('a').combine(Layer('cut')).combine(Layer.error('b'))
+
+    assert combined.name == 'cut'
+    assert combined.warn_level == 'error'
+    assert combined.warnings == ('a', 'b')
@@ -0,0 +1,30 @@
+import multiprocessing
+import os
+
+from lasergen.export import export_svg_with_paths, place_2d_objects
+from lasergen.units import Rel
+from lasergen.util import parallel_map
+
+
+def square(x):
+    return x * x
+
+def get_pid(x):
+    return os.getpid()
+
+
+def test_parallel_map_keeps_order():
+    assert parallel_map(square, range(10), 3) == [x * x for x in range(10)]
+    assert os.getpid() not in parallel_map(get_pid, range(3), 3)
+
+def test_parallel_map_is_serial_without_fork(monkeypatch):
+    monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+
+    assert parallel_map(get_pid, range(3), 3) == [os.getpid()] * 3
+
+def test_parallel_render_matches_serial(config, make_box):
+    serial = make_box(sizes=[Rel(1), Rel(1), Rel(2)]).render(config)
+    parallel = make_box(sizes=[Rel(1), Rel(1), Rel(2)]).render(config, workers=3)
+
+    assert [o.primitives for o in parallel] == [o.primitives for o in serial]
+    assert export_svg_with_paths(place_2d_objects(parallel, config), config) == export_svg_with_paths(place_2d_objects(serial, config), config)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from lasergen.layer import Layer
+from lasergen.primitive import ArcPath, Circle, Line, Object2D, Object2DBuilder, Polygon, Polyline, Text
+
+
+def test_line_translation_is_elementwise():
+    line = Line(np.array([0, 0]), np.array([1, 2])) + np.array([10, 20])
+
+    assert isinstance(line.start, np.ndarray)
+    assert (line.start == [10, 20]).all()
+    assert (line.end == [11, 22]).all()
+
+def test_primitives_are_hashable():
+    assert Line([0, 0], [1, 2]) == Line(np.array([0., 0.]), np.array([1., 2.]))
+    assert len({Circle([1, 1], 2), Circle([1, 1], 2), Text([0, 0], 'a')}) == 2
+
+def test_object_round_trips_primitives():
+    primitives = [Line([0, 0], [1, 2]), Circle([1, 1], 2), Text([3, 4], 'a')]
+
+    assert Object2D(primitives).primitives == tuple(primitives)
+
+def test_object_keeps_integer_font_sizes():
+    (text,) = (Object2D([Text([3, 4], 'a', 5)]) + np.array([1, 1])).primitives
+
+    assert text.fontsize == 5 and isinstance(text.fontsize, int)
+
+def test_object_primitives_are_read_only():
+    o = Object2D([Line([0, 0], [1, 2])])
+
+    with pytest.raises(AttributeError):
+        o.primitives.append(Line([1, 2], [3, 4]))
+
+def test_concatenation_keeps_layers_texts_and_vertices():
+    cut, info = Layer('cutout'), Layer('info')
+    a = Object2D([Text([0, 0], 'a', layer=info), Polygon([[0, 0], [1, 0], [1, 1]], layer=cut)])
+    b = Object2D([Polyline([[2, 2], [3, 3], [4, 2]], layer=cut), Text([5, 5], 'b', layer=info)])
+
+    assert (a + b).primitives == a.primitives + b.primitives
+
+def test_object_transforms_are_deferred():
+    primitives = [
+            Line([0, 0], [1, 2]),
+            Circle([1, 1], 2),
+            ArcPath([0, 0], [2, 0], 1, False, True),
+            Polyline([[0, 0], [1, 1], [2, 0]]),
+            Polygon([[0, 0], [1, 1], [2, 0]]),
+        ]
+    o = Object2D(primitives)
+
+    transformed = ((o.rotate(90).mirror([True, False]) + np.array([3, 4])).scale(2)).reverse()
+
+    # the columns are shared until the geometry is needed
+    assert transformed._start is o._start
+
+    expected = [(p.rotate(90).mirror([True, False]) + np.array([3, 4])).scale(2).reverse() for p in primitives]
+
+    assert transformed.primitives == tuple(expected[::-1])
+    assert o.primitives == tuple(primitives)
+
+def test_builder_keeps_order_of_parts():
+    a, b, c = Line([0, 0], [1, 0]), Circle([1, 1], 2), Text([3, 4], 'a')
+    part = Object2D([b]) + np.array([1, 1])
+
+    builder = Object2DBuilder()
+    builder.append(a)
+    builder.extend(part)
+    builder.append(c)
+
+    # later changes to the part don't affect the builder
+    part.extend(Object2D([a]))
+
+    assert builder.build().primitives == (a, b + np.array([1, 1]), c)
+    assert Object2DBuilder().build().primitives == ()
+
+def test_object_bounding_box_cache():
+    o = Object2D([Line([0, 0], [1, 2]), Circle([1, 1], 2)])
+    vmin, vmax = o.bounding_box()
+    assert (vmin == [-1, -1]).all() and (vmax == [3, 3]).all()
+
+    # returned corners are copies
+    vmin[:] = 100
+    assert (o.bounding_box()[0] == [-1, -1]).all()
+
+    o.extend(Object2D([Line([5, 5], [6, 7])]))
+    assert (o.bounding_box()[1] == [6, 7]).all()
+
+    # axis aligned transformations derive the box from the cached one
+    moved = o.mirror([True, False]) + np.array([1, 1])
+    assert moved._bbox is not None
+    assert np.allclose(moved.bounding_box(), moved._calc_bounding_box())
+
+    rotated = o.rotate(45)
+    assert rotated._bbox is None
+    assert np.allclose(rotated.bounding_box(), rotated._calc_bounding_box())
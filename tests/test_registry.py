@@ -0,0 +1,44 @@
+import pytest
+
+from lasergen.util import DIR
+
+
+@pytest.fixture
+def named_box(make_box):
+    return make_box(name='Root', names=['Left', 'Right'])
+
+def walk_walls(box):
+    walls = []
+    for b in box._get_boxes():
+        for d in DIR.DIRS:
+            wref = b.get_wall_by_direction(d)
+            if wref is not None and wref.dereference() not in walls:
+                walls.append(wref.dereference())
+    return walls
+
+
+def test_registry_lists_all_walls_once(named_box):
+    box = named_box
+
+    walls = [w for w, _, _ in box.registry.get_placements()]
+
+    assert len(walls) == len(set(walls))
+    assert set(walls) == set(walk_walls(box))
+
+def test_registry_lookups(config, named_box):
+    box = named_box
+    left = box.registry.get_box('Left')
+
+    assert left is box.subboxes[0]
+    assert box.registry.get_wall('Left.DOWN') is left.get_wall_by_direction(DIR.DOWN)
+    assert [w for w, _, _ in box.registry.get_box_walls('Left')] == [w for w, _, _ in left._gather_own_walls(config)]
+    assert all(d is DIR.UP or (d == DIR.UP).all() for _, _, d in box.registry.get_walls_by_direction(DIR.UP))
+
+    for e in box.registry.edges:
+        assert box.registry.get_edge(e.get_name()).get_name() == e.get_name()
+
+def test_subboxes_share_the_root_registry(config, named_box):
+    box = named_box
+
+    assert box.subboxes[1]._get_registry(config) is box.registry
+    assert [o.primitives for o in box.subboxes[1].render(config)] == [w.render(config).primitives for w, _, _ in box.registry.get_placements(box.subboxes[1])]
@@ -0,0 +1,24 @@
+from lasergen.edge import EDGE_ELEMENT_STYLE
+
+
+def flatten_first_subwall_edge(box):
+    # the subwall's edge is the counterpart of the cutout edge in the UP wall
+    box._cutout_edges[0].counterpart.dereference().set_style(EDGE_ELEMENT_STYLE.FLAT, set_counterpart=False)
+
+
+def test_cached_render_follows_cutout_edge_counterparts(make_box, render_primitives):
+    box = make_box()
+    render_primitives(box)
+    flatten_first_subwall_edge(box)
+
+    fresh = make_box()
+    flatten_first_subwall_edge(fresh)
+
+    assert render_primitives(box) == render_primitives(fresh)
+
+def test_cached_render_is_reused(config, make_box):
+    box = make_box()
+    first = box.render(config)
+    second = box.render(config)
+
+    assert [o.primitives for o in first] == [o.primitives for o in second]
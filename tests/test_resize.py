@@ -0,0 +1,38 @@
+import pytest
+
+from lasergen.edge import EDGE_ELEMENT_STYLE
+from lasergen.units import Rel
+from lasergen.util import DIR
+
+
+@pytest.mark.parametrize('axis, size', [(DIR.RIGHT, 160), (DIR.UP, 50), (DIR.UP, 120)])
+def test_resized_box_matches_fresh_box(config, make_box, render_primitives, axis, size):
+    box = make_box(100, 80, sizes=[Rel(1), 30], children=True)
+    render_primitives(box)
+    box.set_size(axis, size, config)
+
+    width, height = (size, 80) if axis is DIR.RIGHT else (100, size)
+
+    assert render_primitives(box) == render_primitives(make_box(width, height, sizes=[Rel(1), 30], children=True))
+
+def test_shrinking_below_edge_elements_restores_sizes(config, make_box, render_primitives):
+    box = make_box()
+    edge = box.get_wall_by_direction(DIR.DOWN).get_edge_by_direction(DIR.RIGHT).dereference()
+    edge.add_element(45, 10, EDGE_ELEMENT_STYLE.FLAT)
+    before = render_primitives(box)
+
+    with pytest.raises(ValueError, match='exceeds edge length 40'):
+        box.set_size(DIR.FRONT, 40, config)
+
+    assert box.size[2] == 60 and box.abs_size[2] == 60
+    assert edge.length == 60
+    assert render_primitives(box) == before
+
+def test_own_wall_references_follow_resize(config, make_box):
+    box = make_box()
+    reference = box.subboxes[1].get_wall_by_direction(DIR.DOWN).get_reference([5, 5])
+    box.set_size(DIR.RIGHT, 160, config)
+
+    fresh = make_box(160).subboxes[1].get_wall_by_direction(DIR.DOWN).get_reference([5, 5])
+
+    assert (reference.get_total_offset() == fresh.get_total_offset()).all()
@@ -0,0 +1,54 @@
+import pickle
+import zlib
+
+import pytest
+
+from lasergen import snapshot
+from lasergen.box import Box, ClosedBox
+from lasergen.planar import CircleCutout
+from lasergen.primitive import Text
+from lasergen.units import Rel
+from lasergen.util import DIR
+
+
+def test_round_trip_renders_the_same(tmp_path, make_box, render_primitives):
+    box = make_box(sizes=[Rel(1), Rel(2)], children=True)
+    box.get_wall_by_direction(DIR.DOWN).add_child(Text([0, 0], 'label'), [10, 10])
+
+    filename = tmp_path / 'box.lgbox'
+    box.save(filename)
+
+    assert render_primitives(Box.load(filename)) == render_primitives(box)
+    assert render_primitives(Box.loads(box.dumps())) == render_primitives(box)
+
+def test_rejects_other_versions():
+    data = ClosedBox(10, 10, 10).dumps()
+    data = snapshot.MAGIC + b'\xff\xff' + data[len(snapshot.MAGIC) + 2:]
+
+    with pytest.raises(ValueError):
+        Box.loads(data)
+
+class _Exploit():
+    def __reduce__(self):
+        return (print, ('unpickled',))
+
+def test_rejects_foreign_globals():
+    data = ClosedBox(10, 10, 10).dumps()
+    header = data[:len(snapshot.MAGIC) + 2]
+    payload = pickle.dumps(_Exploit())
+
+    with pytest.raises(pickle.UnpicklingError):
+        Box.loads(header + zlib.compress(payload))
+
+class _OwnCutout(CircleCutout):
+    pass
+
+def test_own_classes_need_to_be_allowed(make_box, render_primitives):
+    box = make_box()
+    box.get_wall_by_direction(DIR.UP).add_child(_OwnCutout(3), [20, 20])
+    data = box.dumps()
+
+    with pytest.raises(pickle.UnpicklingError, match='_OwnCutout'):
+        Box.loads(data)
+
+    assert render_primitives(Box.loads(data, extra_classes=[_OwnCutout])) == render_primitives(box)
@@ -0,0 +1,41 @@
+from lasergen.box import ClosedBox
+from lasergen.planar import CircleCutout
+from lasergen.sweep import parameter_grid, sweep
+from lasergen.units import Rel
+from lasergen.util import DIR
+
+
+def design(width, depth, parts=2):
+    box = ClosedBox(width, 60, depth)
+    box.subdivide(DIR.RIGHT, [Rel(1)] * parts)
+    return box
+
+def decorate(box, params):
+    box.get_wall_by_direction(DIR.FRONT).add_child(CircleCutout(3), [20, 20])
+
+def render_fresh(config, params):
+    box = design(**params)
+    box.configure(config)
+    decorate(box, params)
+    return [o.primitives for o in box.render(config)]
+
+
+def test_parameter_grid_varies_last_parameter_fastest():
+    assert list(parameter_grid({'a': [1, 2], 'b': [3, 4]})) == [
+            {'a': 1, 'b': 3},
+            {'a': 1, 'b': 4},
+            {'a': 2, 'b': 3},
+            {'a': 2, 'b': 4},
+        ]
+
+def test_sweep_matches_fresh_boxes(config):
+    grid = list(parameter_grid({'width': [100, 140], 'depth': [40, 70]})) + [{'width': 100, 'depth': 40, 'parts': 3}]
+
+    results = []
+    stats = sweep(design, grid, config, exporter=lambda params, objects: results.append((params, [o.primitives for o in objects])), decorate=decorate)
+
+    assert stats.variants == 5
+    assert stats.rebuilds == 2
+
+    for params, primitives in results:
+        assert primitives == render_fresh(config, params)
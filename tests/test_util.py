@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from lasergen.box import Box
+from lasergen.util import DIR, DIR2, arc_bounding_boxes
+from lasergen.wall import Wall
+
+
+# quarter circle from (1, 0) to (0, 1), small and large arcs in both
+# directions, and a half circle with a radius too small to reach the end
+@pytest.mark.parametrize('end, radius, large_arc, sweep, expected', [
+        ([0, 1], 1, False, True,  ([0, 0], [1, 1])),
+        ([0, 1], 1, False, False, ([0, 0], [1, 1])),
+        ([0, 1], 1, True,  True,  ([0, 0], [2, 2])),
+        ([0, 1], 1, True,  False, ([-1, -1], [1, 1])),
+        ([-1, 0], 0.5, False, True, ([-1, 0], [1, 1])),
+        ([1, 0], 1, True, True, ([1, 0], [1, 0])),
+    ])
+def test_arc_bounding_box(end, radius, large_arc, sweep, expected):
+    vmin, vmax = arc_bounding_boxes([1, 0], end, radius, large_arc, sweep)
+
+    assert np.allclose(vmin, [expected[0]])
+    assert np.allclose(vmax, [expected[1]])
+
+def test_arc_bounding_boxes_are_vectorized():
+    rng = np.random.default_rng(0)
+    start, end = rng.uniform(-5, 5, (2, 20, 2))
+    radius = np.linalg.norm(start - end, axis=1) * rng.uniform(0.5, 2, 20)
+    large_arc, sweep = rng.integers(0, 2, (2, 20)).astype(bool)
+
+    vmin, vmax = arc_bounding_boxes(start, end, radius, large_arc, sweep)
+
+    for i in range(20):
+        single = arc_bounding_boxes(start[i], end[i], radius[i], large_arc[i], sweep[i])
+        assert np.allclose(single[0][0], vmin[i]) and np.allclose(single[1][0], vmax[i])
+
+@pytest.mark.parametrize('d', [DIR.RIGHT, [-1, 0, 0], (0, 1, 0), np.array([0., -1., 0.]), np.array([0, 0, 1]), [0, 0, -1]])
+def test_direction_codes_accept_any_vector_type(d):
+    c = DIR.code(d)
+
+    assert c is not None
+    assert (DIR.DIRS[c] == np.asarray(d)).all()
+    assert DIR.dir_to_name(d) == DIR.NAMES[c]
+
+@pytest.mark.parametrize('d', [[1, 1, 0], [0, 0, 0], [2, 0, 0], [1, 0], 'UP', None])
+def test_non_directions_have_no_code(d):
+    assert DIR.code(d) is None
+    assert not DIR.is_dir(d)
+
+def test_direction_tables():
+    for d in DIR.DIRS:
+        axes = DIR.perpendicular_axes(d)
+        assert len(axes) == 2 and all((a * d == 0).all() for a in axes)
+        assert (DIR.project_along_axis(np.array([1, 2, 3]), d) == [i for i, x in zip([1, 2, 3], d) if x == 0]).all()
+        assert (DIR.project_along_axis([1, 2, 3], list(d)) == DIR.project_along_axis(np.array([1, 2, 3]), d)).all()
+
+    assert [DIR.is_axis(d) for d in DIR.DIRS] == [True, False] * 3
+
+def test_wall_and_edge_indices():
+    assert [Box._get_wall_index_by_direction(list(d)) for d in [DIR.UP, DIR.DOWN, DIR.LEFT, DIR.RIGHT, DIR.FRONT, DIR.BACK]] == list(range(6))
+    assert [Wall._get_edge_index_by_direction(list(d)) for d in [DIR2.UP, DIR2.DOWN, DIR2.LEFT, DIR2.RIGHT]] == list(range(4))
+    assert Wall._get_edge_index_by_direction([1, 1]) is None